@@ -0,0 +1,110 @@
+import threading
+
+import pygame
+
+
+class AssetManager:
+    # Общий кэш картинок по ключу (путь, размер, флаги).
+    # Декодирование с диска можно запустить заранее в фоновом потоке,
+    # а конвертация в формат экрана всегда делается в основном потоке.
+    def __init__(self):
+        self.images = {}
+        self.decoded = {}
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.hits = 0
+        self.misses = 0
+        self.preloaded = 0
+
+    @staticmethod
+    def make_key(path, size=None, alpha=True):
+        return (path, tuple(size) if size else None, "alpha" if alpha else "opaque")
+
+    @staticmethod
+    def decode(path, size):
+        image = pygame.image.load(path)
+        if size:
+            image = pygame.transform.scale(image, size)
+        return image
+
+    def convert(self, image, alpha):
+        if pygame.display.get_surface() is None:
+            return image
+        return image.convert_alpha() if alpha else image.convert()
+
+    def image(self, path, size=None, alpha=True):
+        key = self.make_key(path, size, alpha)
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        if key in self.pending:
+            self.wait()
+        with self.lock:
+            raw = self.decoded.pop(key, None)
+        if raw is not None:
+            self.preloaded += 1
+        else:
+            self.misses += 1
+            raw = self.decode(path, size)
+
+        image = self.convert(raw, alpha)
+        self.images[key] = image
+        return image
+
+    def preload(self, specs, background=True):
+        # specs: [(путь, размер, alpha), ...]
+        keys = []
+        for path, size, alpha in specs:
+            key = self.make_key(path, size, alpha)
+            if key not in self.images and key not in self.decoded:
+                keys.append(key)
+        if not keys:
+            return
+        self.pending.update(keys)
+        if background:
+            self.wait()
+            self.thread = threading.Thread(target=self.decode_all, args=(keys,), daemon=True)
+            self.thread.start()
+        else:
+            self.decode_all(keys)
+
+    def decode_all(self, keys):
+        for key in keys:
+            path, size, _ = key
+            try:
+                raw = self.decode(path, size)
+            except (pygame.error, OSError):
+                # Ошибка всплывёт при синхронной загрузке в image()
+                raw = None
+            with self.lock:
+                if raw is not None:
+                    self.decoded[key] = raw
+                self.pending.discard(key)
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def memory_bytes(self):
+        total = 0
+        for image in list(self.images.values()) + list(self.decoded.values()):
+            total += image.get_pitch() * image.get_height()
+        return total
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "preloaded": self.preloaded,
+            "entries": len(self.images),
+            "bytes": self.memory_bytes(),
+        }
+
+    def clear(self):
+        self.wait()
+        self.images.clear()
+        self.decoded.clear()
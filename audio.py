@@ -0,0 +1,209 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+MIXER_FREQUENCY = 44100
+# Маленький буфер SDL - меньше задержка до звука, но чаще будится аудиопоток
+MIXER_BUFFER = 512
+CHANNEL_COUNT = 12
+
+# Звуки синтезируются при загрузке (своих файлов у игры нет): частота
+# скользит от freq[0] к freq[1], noise - доля шума, decay - скорость затухания.
+# Файл sounds/<имя>.wav или .ogg рядом с игрой заменяет синтезированный звук.
+SOUND_EFFECTS = {
+    "attack": dict(duration=0.14, freq=(900, 250), noise=0.6, decay=18, volume=0.35, priority=1),
+    "projectile": dict(duration=0.10, freq=(1400, 700), noise=0.0, decay=25, volume=0.15, priority=0),
+    "player_hurt": dict(duration=0.25, freq=(300, 120), noise=0.3, decay=10, volume=0.5, priority=2),
+    "boss_hurt": dict(duration=0.20, freq=(180, 90), noise=0.4, decay=12, volume=0.5, priority=2),
+    "death": dict(duration=0.9, freq=(400, 40), noise=0.2, decay=3, volume=0.6, priority=3),
+}
+
+
+def init_mixer():
+    # Возвращает False, если звукового устройства нет; игра тогда идёт без звука
+    if pygame.mixer.get_init():
+        return True
+    try:
+        pygame.mixer.init(MIXER_FREQUENCY, -16, 2, MIXER_BUFFER)
+    except pygame.error as error:
+        print(f"Audio disabled: {error}")
+        return False
+    return True
+
+
+def synthesize(rate, duration, freq, noise=0.0, decay=10.0, volume=0.5, seed=0):
+    n = max(1, int(rate * duration))
+    t = np.arange(n, dtype=np.float32) / rate
+    frequency = np.linspace(freq[0], freq[1], n, dtype=np.float32)
+    phase = np.cumsum(frequency) * (2 * np.pi / rate)
+    wave = np.sin(phase) * (1.0 - noise)
+    if noise:
+        wave += np.random.default_rng(seed).uniform(-1.0, 1.0, n).astype(np.float32) * noise
+    # Короткая атака без щелчка и экспоненциальное затухание
+    envelope = np.exp(-decay * t) * np.minimum(1.0, t / 0.005)
+    return wave * envelope * volume
+
+
+class SoundBank:
+    # Все эффекты декодированы в память при загрузке: проигрывание - это
+    # только постановка готового буфера на канал
+    def __init__(self, sounds_dir=None):
+        self.sounds = {}
+        self.priorities = {}
+        self.sounds_dir = sounds_dir
+
+    def load_defaults(self, effects=SOUND_EFFECTS):
+        for seed, (name, spec) in enumerate(effects.items()):
+            spec = dict(spec)
+            priority = spec.pop("priority", 0)
+            path = self.find_file(name)
+            if path is not None:
+                self.load(name, path, priority)
+            else:
+                self.add_samples(name, synthesize(pygame.mixer.get_init()[0], seed=seed, **spec), priority)
+
+    def find_file(self, name):
+        if self.sounds_dir is None:
+            return None
+        for extension in (".wav", ".ogg"):
+            path = os.path.join(self.sounds_dir, name + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def load(self, name, path, priority=0):
+        # pygame.mixer.Sound декодирует файл целиком
+        self.sounds[name] = pygame.mixer.Sound(path)
+        self.priorities[name] = priority
+
+    def add_samples(self, name, samples, priority=0):
+        # samples - моно float в [-1, 1]; приводится к формату микшера
+        _, size, channels = pygame.mixer.get_init()
+        bits = abs(size)
+        if bits == 8:
+            data = ((samples + 1.0) * 127.5).astype(np.uint8 if size > 0 else np.int8)
+        elif bits == 16:
+            data = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        else:
+            data = np.clip(samples, -1.0, 1.0).astype(np.float32)
+        if channels > 1:
+            data = np.repeat(data[:, None], channels, axis=1)
+        self.sounds[name] = pygame.sndarray.make_sound(np.ascontiguousarray(data))
+        self.priorities[name] = priority
+
+    def __contains__(self, name):
+        return name in self.sounds
+
+
+class SoundSystem:
+    # Звуки игры. play() из игрового цикла только кладёт запрос в очередь;
+    # выбор канала и запуск идут в отдельном потоке. Каналов фиксированное
+    # число: если все заняты, вытесняется самый старый звук с наименьшим
+    # приоритетом, но только не важнее нового - иначе новый звук пропускается.
+    def __init__(self, enabled=True, channels=CHANNEL_COUNT, sounds_dir=None, history=512):
+        self.enabled = enabled and init_mixer()
+        self.bank = SoundBank(sounds_dir)
+        self.counts = {"triggered": 0, "played": 0, "stolen": 0, "dropped": 0}
+        self.latencies = deque(maxlen=history)
+        self.music_path = None
+        if not self.enabled:
+            return
+        self.bank.load_defaults()
+        pygame.mixer.set_num_channels(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        # Что сейчас играет на канале: (приоритет, время запуска)
+        self.voices = [(0, 0.0)] * channels
+        frequency, _, _ = pygame.mixer.get_init()
+        self.buffer_ms = MIXER_BUFFER * 1000.0 / frequency
+        self.requests = queue.SimpleQueue()
+        self.worker = threading.Thread(target=self.dispatch_loop, daemon=True)
+        self.worker.start()
+
+    def play(self, name, priority=None):
+        if not self.enabled:
+            return
+        self.counts["triggered"] += 1
+        self.requests.put((name, priority, time.perf_counter()))
+
+    def dispatch_loop(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            self.dispatch(*request)
+
+    def dispatch(self, name, priority, triggered_at):
+        sound = self.bank.sounds.get(name)
+        if sound is None:
+            return
+        if priority is None:
+            priority = self.bank.priorities.get(name, 0)
+        index = self.pick_channel(priority)
+        if index is None:
+            self.counts["dropped"] += 1
+            return
+        channel = self.channels[index]
+        if channel.get_busy():
+            channel.stop()
+            self.counts["stolen"] += 1
+        channel.play(sound)
+        now = time.perf_counter()
+        self.voices[index] = (priority, now)
+        self.counts["played"] += 1
+        self.latencies.append((now - triggered_at) * 1000.0)
+
+    def pick_channel(self, priority):
+        victim = None
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+            voice = self.voices[index]
+            if voice[0] <= priority and (victim is None or voice < self.voices[victim]):
+                victim = index
+        return victim
+
+    def play_music(self, path, volume=0.5, loops=-1):
+        # SDL_mixer читает музыку с диска кусками по мере проигрывания
+        if not self.enabled or not path or not os.path.exists(path):
+            return False
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops)
+        self.music_path = path
+        return True
+
+    def stop_music(self):
+        if self.enabled:
+            pygame.mixer.music.stop()
+        self.music_path = None
+
+    def flush(self, timeout=1.0):
+        # Ждёт, пока поток разберёт очередь (для тестов и замеров)
+        deadline = time.perf_counter() + timeout
+        while self.enabled and not self.requests.empty() and time.perf_counter() < deadline:
+            time.sleep(0.001)
+
+    def stats(self):
+        stats = dict(self.counts)
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            stats["dispatch_ms_p50"] = latencies[len(latencies) // 2]
+            stats["dispatch_ms_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            stats["dispatch_ms_max"] = latencies[-1]
+        if self.enabled:
+            # Звук выходит из устройства не раньше, чем через один буфер SDL
+            stats["buffer_ms"] = self.buffer_ms
+        return stats
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.requests.put(None)
+        self.worker.join(timeout=1.0)
+        pygame.mixer.stop()
+        self.stop_music()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from game import Game, GameState, FPS, WINDOW_WIDTH, WINDOW_HEIGHT
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+FRAME_BUDGET_MS = 1000.0 / FPS
+
+ENEMY_COUNTS = [1, 10, 100, 1000, 10000]
+PROJECTILE_COUNTS = [1, 10, 100, 1000, 10000]
+PLATFORM_COUNTS = [10, 100, 1000, 5000]
+PARTICLE_COUNTS = [100, 1000, 4000, 8000]
+COLLISION_COUNTS = [10, 100, 1000, 5000]
+# Внутреннее разрешение в процентах от логического 800x600
+RENDER_SCALE_PERCENTS = [100, 75, 50]
+
+
+def make_game(seed):
+    random.seed(seed)
+    game = Game(headless=True)
+    game.state = GameState.PLAYING
+    # Игрок не должен умереть посреди замера
+    game.player.max_health = game.player.health = 10 ** 9
+    return game
+
+
+def populate_enemies(game, count):
+    game.spawn_enemies(count)
+
+
+def populate_projectiles(game, count):
+    for _ in range(count):
+        x = random.randint(0, WINDOW_WIDTH)
+        y = random.randint(0, WINDOW_HEIGHT)
+        # Медленные снаряды остаются на экране весь замер
+        game.projectiles.spawn_velocity(x, y, random.choice((-1, 1)), random.choice((-1, 1)))
+
+
+def populate_platforms(game, count):
+    for _ in range(count - len(game.platforms)):
+        game.add_platform(random.randint(0, WINDOW_WIDTH - 60), random.randint(0, WINDOW_HEIGHT - 70), 60, 20)
+
+
+def populate_particles(game, count):
+    # Долгоживущие частицы без гравитации остаются на экране весь замер
+    particles = game.particles
+    particles.add_preset("bench", count=1, speed=(0.0, 0.5), life=(10 ** 6, 10 ** 6), gravity=0.0, drag=1.0,
+                         color=(255, 160, 60), radius=5)
+    for _ in range(count):
+        particles.emit("bench", random.randint(0, WINDOW_WIDTH), random.randint(0, WINDOW_HEIGHT))
+
+
+def populate_collisions(game, count):
+    # Поровну платформ, врагов и снарядов: все проверки столкновений update_playing
+    populate_platforms(game, count)
+    populate_enemies(game, count)
+    populate_projectiles(game, count)
+
+
+def populate_collisions_discrete(game, count):
+    game.swept_collisions = False
+    populate_collisions(game, count)
+
+
+def populate_resolution(game, percent):
+    # Одна и та же сцена при разном внутреннем разрешении
+    game.set_render_scale(percent / 100.0)
+    populate_enemies(game, 200)
+    populate_projectiles(game, 200)
+    game.particles.emit("boss_hit", WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2, count=500)
+
+
+SCENARIOS = {
+    "enemies": (ENEMY_COUNTS, populate_enemies),
+    "projectiles": (PROJECTILE_COUNTS, populate_projectiles),
+    "platforms": (PLATFORM_COUNTS, populate_platforms),
+    "particles": (PARTICLE_COUNTS, populate_particles),
+    "collisions_swept": (COLLISION_COUNTS, populate_collisions),
+    "collisions_discrete": (COLLISION_COUNTS, populate_collisions_discrete),
+    "resolution": (RENDER_SCALE_PERCENTS, populate_resolution),
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+def run_scenario(kind, size, frames, warmup, seed=0):
+    game = make_game(seed)
+    SCENARIOS[kind][1](game, size)
+
+    update_ms = []
+    draw_ms = []
+    for frame in range(warmup + frames):
+        start = time.perf_counter()
+        game.update_playing()
+        middle = time.perf_counter()
+        game.draw_playing()
+        end = time.perf_counter()
+        if frame >= warmup:
+            update_ms.append((middle - start) * 1000.0)
+            draw_ms.append((end - middle) * 1000.0)
+
+    return {"update": summarize(update_ms), "draw": summarize(draw_ms)}
+
+
+def run_all(frames, warmup, kinds=None, max_size=None):
+    results = {}
+    for kind, (sizes, _) in SCENARIOS.items():
+        if kinds and kind not in kinds:
+            continue
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            key = f"{kind}/{size}"
+            results[key] = run_scenario(kind, size, frames, warmup)
+            print_row(key, results[key])
+    return results
+
+
+def print_row(key, result):
+    update = result["update"]
+    draw = result["draw"]
+    total_p95 = update["p95"] + draw["p95"]
+    status = "ok" if total_p95 <= FRAME_BUDGET_MS else "OVER BUDGET"
+    print(f"{key:<26} update p50/p95/p99 {update['p50']:7.3f} {update['p95']:7.3f} {update['p99']:7.3f} ms"
+          f" | draw p50/p95/p99 {draw['p50']:7.3f} {draw['p95']:7.3f} {draw['p99']:7.3f} ms | {status}")
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for phase in ("update", "draw"):
+            for stat in ("p50", "p95"):
+                old = baseline[key][phase][stat]
+                new = result[phase][stat]
+                # Очень короткие замеры слишком шумные, чтобы сравнивать их в процентах
+                if new > old * (1.0 + tolerance) and new - old > 0.05:
+                    regressions.append(f"{key} {phase} {stat}: {old:.3f} -> {new:.3f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер времени кадра update_playing/draw_playing")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--max-size", type=int)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_all(args.frames, args.warmup, args.only, args.max_size)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("REGRESSIONS:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    code = main()
+    pygame.quit()
+    sys.exit(code)
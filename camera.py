@@ -0,0 +1,63 @@
+import pygame
+
+
+class Camera:
+    # Окно просмотра в мировых координатах. Следует за целью, когда та
+    # выходит из мёртвой зоны в центре экрана, и не выходит за границы мира.
+    def __init__(self, view_size, world_rect, dead_zone=(200, 150)):
+        self.rect = pygame.Rect((0, 0), view_size)
+        self.world = pygame.Rect(world_rect)
+        self.dead_zone = dead_zone
+        self.drawn = 0
+        self.culled = 0
+
+    def set_world(self, world_rect):
+        self.world = pygame.Rect(world_rect)
+        self.clamp()
+
+    def is_static(self):
+        # Мир помещается в экран целиком - камере некуда двигаться
+        return self.world.width <= self.rect.width and self.world.height <= self.rect.height
+
+    def clamp(self):
+        if self.world.width <= self.rect.width:
+            self.rect.x = self.world.x
+        else:
+            self.rect.x = max(self.world.left, min(self.rect.x, self.world.right - self.rect.width))
+        if self.world.height <= self.rect.height:
+            self.rect.y = self.world.y
+        else:
+            self.rect.y = max(self.world.top, min(self.rect.y, self.world.bottom - self.rect.height))
+
+    def center_on(self, target_rect):
+        self.rect.center = target_rect.center
+        self.clamp()
+
+    def follow(self, target_rect):
+        # Возвращает True, если камера сдвинулась
+        old = self.rect.topleft
+        zone = pygame.Rect((0, 0), self.dead_zone)
+        zone.center = self.rect.center
+        if target_rect.centerx < zone.left:
+            self.rect.x -= zone.left - target_rect.centerx
+        elif target_rect.centerx > zone.right:
+            self.rect.x += target_rect.centerx - zone.right
+        if target_rect.centery < zone.top:
+            self.rect.y -= zone.top - target_rect.centery
+        elif target_rect.centery > zone.bottom:
+            self.rect.y += target_rect.centery - zone.bottom
+        self.clamp()
+        return self.rect.topleft != old
+
+    @property
+    def offset(self):
+        return -self.rect.x, -self.rect.y
+
+    def world_to_screen(self, rect):
+        return rect.move(-self.rect.x, -self.rect.y)
+
+    def screen_to_world(self, point):
+        return point[0] + self.rect.x, point[1] + self.rect.y
+
+    def stats(self):
+        return {"drawn": self.drawn, "culled": self.culled}
@@ -0,0 +1,103 @@
+import math
+
+import numpy as np
+
+# Нормали граней препятствия: с какой стороны в него вошёл движущийся прямоугольник
+TOP = (0, -1)
+BOTTOM = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+ALL_FACES = frozenset((TOP, BOTTOM, LEFT, RIGHT))
+
+
+def slab(start, size, delta, lo, hi):
+    # Интервал времени, когда отрезок [start, start + size), сдвигаемый на
+    # delta, пересекается с [lo, hi) по одной оси
+    if delta == 0:
+        if start + size <= lo or start >= hi:
+            return math.inf, -math.inf
+        return -math.inf, math.inf
+    t0 = (lo - (start + size)) / delta
+    t1 = (hi - start) / delta
+    return (t0, t1) if t0 < t1 else (t1, t0)
+
+
+def sweep_aabb(moving, dx, dy, obstacle):
+    # Время входа (0..1) прямоугольника moving, сдвигаемого на (dx, dy),
+    # в obstacle и нормаль грани входа; None, если входа нет или
+    # прямоугольники уже перекрываются
+    tx0, tx1 = slab(moving.x, moving.width, dx, obstacle.left, obstacle.right)
+    ty0, ty1 = slab(moving.y, moving.height, dy, obstacle.top, obstacle.bottom)
+    entry = max(tx0, ty0)
+    exit = min(tx1, ty1)
+    if entry >= exit or entry < 0 or entry > 1:
+        return None
+    if tx0 > ty0:
+        return entry, (-1 if dx > 0 else 1, 0)
+    return entry, (0, -1 if dy > 0 else 1)
+
+
+def move_and_slide(rect, dx, dy, obstacles, faces=ALL_FACES, iterations=3):
+    # Сдвигает rect на (dx, dy), останавливаясь на первом препятствии и
+    # скользя вдоль него остатком движения. Грани не из faces пропускаются
+    # (например, платформы, через которые можно запрыгнуть снизу).
+    # Возвращает список (нормаль, препятствие) для каждого касания.
+    contacts = []
+    for _ in range(iterations):
+        if dx == 0 and dy == 0:
+            break
+        first = None
+        for obstacle in obstacles:
+            hit = sweep_aabb(rect, dx, dy, obstacle)
+            if hit is not None and hit[1] in faces and (first is None or hit[0] < first[0]):
+                first = (hit[0], hit[1], obstacle)
+        if first is None:
+            break
+        t, normal, obstacle = first
+        if normal[0]:
+            step_y = int(dy * t)
+            if normal[0] < 0:
+                rect.right = obstacle.left
+            else:
+                rect.left = obstacle.right
+            rect.y += step_y
+            dx = 0
+            dy -= step_y
+        else:
+            step_x = int(dx * t)
+            if normal[1] < 0:
+                rect.bottom = obstacle.top
+            else:
+                rect.top = obstacle.bottom
+            rect.x += step_x
+            dx -= step_x
+            dy = 0
+        contacts.append((normal, obstacle))
+    rect.move_ip(dx, dy)
+    return contacts
+
+
+def sweep_hits(left, top, width, height, vx, vy, rect):
+    # Векторная проверка для массивов прямоугольников: задел ли каждый из
+    # них rect на пути (left, top) -> (left + vx, top + vy). В отличие от
+    # sweep_aabb, перекрытие в начале пути тоже считается попаданием.
+    left = np.asarray(left, dtype=np.float64)
+    top = np.asarray(top, dtype=np.float64)
+    vx = np.broadcast_to(np.asarray(vx, dtype=np.float64), left.shape)
+    vy = np.broadcast_to(np.asarray(vy, dtype=np.float64), left.shape)
+    entry_x, exit_x = slabs(left, width, vx, rect.left, rect.right)
+    entry_y, exit_y = slabs(top, height, vy, rect.top, rect.bottom)
+    entry = np.maximum(entry_x, entry_y)
+    exit = np.minimum(exit_x, exit_y)
+    return (entry < exit) & (exit > 0) & (entry < 1)
+
+
+def slabs(start, size, delta, lo, hi):
+    moving = delta != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t0 = (lo - (start + size)) / delta
+        t1 = (hi - start) / delta
+    overlap = (start < hi) & (start + size > lo)
+    entry = np.where(moving, np.minimum(t0, t1), np.where(overlap, -np.inf, np.inf))
+    exit = np.where(moving, np.maximum(t0, t1), np.where(overlap, np.inf, -np.inf))
+    return entry, exit
@@ -0,0 +1,161 @@
+import numpy as np
+
+from collision import sweep_hits
+from render_target import scaled_surface
+
+# Поля состояния патрулирующих врагов; каждое поле - отдельный массив
+ENEMY_WAVE_FIELDS = ("x", "y", "speed", "direction", "movement_counter", "movement_limit",
+                     "health", "damage", "attack_cooldown", "attack_cooldown_max")
+# Плюс x до последнего шага - для проверки касаний по всему пути; в снапшот не входит
+ENEMY_WAVE_ARRAYS = ENEMY_WAVE_FIELDS + ("last_x",)
+
+
+class EnemyWave:
+    # Волна патрулирующих врагов в массивах NumPy. Поведение совпадает с
+    # Enemy.update(), но обновляется вся волна сразу, а рисуется одна общая
+    # картинка. Живые враги всегда занимают первые self.count элементов.
+    def __init__(self, image, capacity=64):
+        self.image = image
+        self.width = image.get_width()
+        self.height = image.get_height()
+        self.count = 0
+        for name in ENEMY_WAVE_ARRAYS:
+            setattr(self, name, np.zeros(capacity, dtype=np.float64))
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def reserve(self, needed):
+        capacity = len(self.x)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ENEMY_WAVE_ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=np.float64)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, xs, ys, speed=2, movement_limit=100, health=3, damage=1, attack_cooldown_max=60):
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        ys = np.broadcast_to(np.asarray(ys, dtype=np.float64), xs.shape)
+        n = len(xs)
+        self.reserve(self.count + n)
+        s = slice(self.count, self.count + n)
+        self.x[s] = xs
+        self.last_x[s] = xs
+        self.y[s] = ys
+        self.speed[s] = speed
+        self.direction[s] = 1
+        self.movement_counter[s] = 0
+        self.movement_limit[s] = movement_limit
+        self.health[s] = health
+        self.damage[s] = damage
+        self.attack_cooldown[s] = 0
+        self.attack_cooldown_max[s] = attack_cooldown_max
+        self.count += n
+
+    def keep(self, mask):
+        keep = np.flatnonzero(mask)
+        k = len(keep)
+        if k != self.count:
+            for name in ENEMY_WAVE_ARRAYS:
+                array = getattr(self, name)
+                array[:k] = array[keep]
+            self.count = k
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        speed = self.speed[:n]
+        direction = self.direction[:n]
+        counter = self.movement_counter[:n]
+        self.last_x[:n] = self.x[:n]
+        # Как и у Enemy, позиция - целые пиксели Rect
+        self.x[:n] = np.trunc(self.x[:n] + speed * direction)
+        counter += np.abs(speed)
+        turn = counter >= self.movement_limit[:n]
+        direction[turn] *= -1
+        counter[turn] = 0
+        cooldown = self.attack_cooldown[:n]
+        np.subtract(cooldown, 1, out=cooldown, where=cooldown > 0)
+
+    def collide_mask(self, rect):
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        return ((x < rect.right) & (x + self.width > rect.left) &
+                (y < rect.bottom) & (y + self.height > rect.top))
+
+    def contact_attacker(self, rect):
+        # Индекс первого врага, который касается rect и готов атаковать
+        if self.count == 0:
+            return None
+        ready = self.collide_mask(rect) & (self.attack_cooldown[:self.count] == 0)
+        hits = np.flatnonzero(ready)
+        return int(hits[0]) if len(hits) else None
+
+    def sweep_attacker(self, rect, dx=0, dy=0):
+        # Как contact_attacker, но касание ищется по всему пути за последний
+        # шаг; rect за этот шаг сдвинулся на (dx, dy)
+        n = self.count
+        if n == 0:
+            return None
+        last_x = self.last_x[:n]
+        hits = sweep_hits(last_x, self.y[:n], self.width, self.height,
+                          self.x[:n] - last_x - dx, -dy, rect.move(-dx, -dy))
+        hits = np.flatnonzero(hits & (self.attack_cooldown[:n] == 0))
+        return int(hits[0]) if len(hits) else None
+
+    def reset_attack_cooldown(self, index):
+        self.attack_cooldown[index] = self.attack_cooldown_max[index]
+
+    def kill_in(self, rect):
+        # Убивает всех врагов, задетых rect, и возвращает их число
+        if self.count == 0:
+            return 0
+        hits = self.collide_mask(rect)
+        killed = int(np.count_nonzero(hits))
+        if killed:
+            self.keep(~hits)
+        return killed
+
+    def screen_corners(self, offset=(0, 0), view=None, scale=1.0):
+        n = self.count
+        corners = np.column_stack((self.x[:n] + offset[0], self.y[:n] + offset[1]))
+        if view is not None:
+            corners = corners[self.collide_mask(view)]
+        if scale != 1.0:
+            corners *= scale
+        return corners.astype(np.int32).tolist()
+
+    def rects(self, offset=(0, 0), view=None):
+        return [(x, y, self.width, self.height) for x, y in self.screen_corners(offset, view)]
+
+    def draw(self, surface, offset=(0, 0), view=None, scale=1.0):
+        if self.count == 0:
+            return 0
+        image = scaled_surface(self.image, scale)
+        corners = self.screen_corners(offset, view, scale)
+        surface.blits([(image, corner) for corner in corners], False)
+        return len(corners)
+
+    def pack_state(self):
+        n = self.count
+        return np.stack([getattr(self, name)[:n] for name in ENEMY_WAVE_FIELDS]).tobytes()
+
+    def restore_state(self, data, offset, count):
+        self.reserve(count)
+        fields = len(ENEMY_WAVE_FIELDS)
+        state = np.frombuffer(data, dtype=np.float64, count=fields * count,
+                              offset=offset).reshape(fields, count)
+        for name, values in zip(ENEMY_WAVE_FIELDS, state):
+            getattr(self, name)[:count] = values
+        self.last_x[:count] = self.x[:count]
+        self.count = count
+        return offset + fields * count * 8
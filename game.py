@@ -1,16 +1,55 @@
+import time
+# Отсчёт холодного старта начинается до импорта pygame и numpy
+STARTUP_T0 = time.perf_counter()
+
 import pygame
 import sys
 import random
 import os
 import math
+import struct
+import argparse
+import numpy as np
 from pygame.locals import *
 from enum import Enum
 
-pygame.init()
+from spatial import SpatialHash, DynamicIndex
+from projectiles import ProjectilePool
+from enemies import EnemyWave
+from asset_manager import AssetManager
+from text_cache import TextCache, HudText
+from levels import ChunkedLevel
+from camera import Camera
+from profiler import FrameProfiler
+from recorder import FrameRecorder
+from particles import ParticleSystem
+from collision import move_and_slide, TOP, LEFT, RIGHT
+from render_target import RenderTarget, PRESENT_MODES, scaled_surface
+from audio import SoundSystem
+
+def init_subsystems():
+    # Только то, что нужно игре: без микшера и джойстиков, которые
+    # поднимает pygame.init()
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if not pygame.font.get_init():
+        pygame.font.init()
 
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 FPS = 60
+IDLE_FPS = 4
+# Симуляция идёт с постоянной частотой тиков; вся физика посчитана на один тик
+TICK_RATE = FPS
+TICK_SECONDS = 1.0 / TICK_RATE
+# Сколько тиков можно догнать за кадр; остальное время отбрасывается
+MAX_TICKS_PER_FRAME = 5
+STATIC_CELL_SIZE = 128
+PROJECTILE_SPEED = 5
+# Пыль при приземлении появляется только после заметного падения
+LANDING_DUST_SPEED = 6
+# На платформу можно запрыгнуть снизу: нижняя грань не останавливает
+PLATFORM_FACES = frozenset((TOP, LEFT, RIGHT))
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -25,6 +64,65 @@ PLAYER_CLOAK = (70, 70, 90)
 
 GAME_DIR = os.path.dirname(os.path.abspath(__file__))
 SPRITE_PATH = os.path.join(GAME_DIR, "assets", "player.png")
+BOSS_SPRITE_PATH = os.path.join(GAME_DIR, "assets", "pngwing.com.png")
+PLAYER_SIZE = (40, 60)
+BOSS_SIZE = (140, 140)
+
+# Картинки загружаются один раз и переживают перезапуски init_game()
+asset_cache = AssetManager()
+PRELOAD_ASSETS = [
+    (SPRITE_PATH, PLAYER_SIZE, True),
+    (BOSS_SPRITE_PATH, BOSS_SIZE, True),
+]
+
+# Форматы бинарного снимка состояния (Game.snapshot / Game.restore)
+SNAPSHOT_MAGIC = b"HKS3"
+SNAPSHOT_HEADER = struct.Struct("<4sBQIIIB")
+# Перед PLAYER_STATE каждого игрока: в группах ли спрайт (выбывшие в кооперативе удалены из мира)
+PLAYER_IN_WORLD = struct.Struct("<?")
+PLAYER_STATE = struct.Struct("<iiiiddd??i?qqiiddd")
+BOSS_STATE = struct.Struct("<?iiqqii")
+RNG_STATE = struct.Struct("<i625I")
+ENEMY_FIELDS = 7
+
+def default_level_platforms():
+    # Встроенный уровень на один экран: пол и три яруса платформ
+    return [
+        (0, WINDOW_HEIGHT - 50, WINDOW_WIDTH, 50),
+
+        (50, WINDOW_HEIGHT - 180, 100, 20),
+        (WINDOW_WIDTH / 2 - 75, WINDOW_HEIGHT - 180, 150, 20),
+        (WINDOW_WIDTH - 200, WINDOW_HEIGHT - 180, 150, 20),
+
+        (200, WINDOW_HEIGHT - 300, 120, 20),
+        (WINDOW_WIDTH - 320, WINDOW_HEIGHT - 300, 120, 20),
+
+        (100, WINDOW_HEIGHT - 420, 80, 20),
+        (WINDOW_WIDTH / 2 - 40, WINDOW_HEIGHT - 420, 80, 20),
+        (WINDOW_WIDTH - 180, WINDOW_HEIGHT - 420, 80, 20),
+
+        (50, WINDOW_HEIGHT - 300, 100, 60),
+    ]
+
+class StartupReport:
+    # Время холодного старта по фазам
+    def __init__(self, start):
+        self.start = start
+        self.last = start
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.start
+
+    def __str__(self):
+        lines = [f"{name:<16} {seconds * 1000:8.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'total':<16} {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
 
 class GameState(Enum):
     MENU = 1
@@ -32,22 +130,195 @@ class GameState(Enum):
     PAUSED = 3
     GAME_OVER = 4
 
+class LiveInput:
+    # Обычный ввод с клавиатуры через очередь событий pygame
+    def __init__(self):
+        self.pending = []
+
+    def advance(self):
+        pass
+
+    def wait(self, timeout):
+        # Спит до прихода события или до истечения timeout (мс, 0 - без ограничения)
+        event = pygame.event.wait(timeout)
+        if event.type == NOEVENT:
+            return False
+        self.pending.append(event)
+        return True
+
+    def get_events(self):
+        events = self.pending + pygame.event.get()
+        self.pending = []
+        return events
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+class HeldKeys:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+class ScriptedInput:
+    # Заранее записанный ввод для headless-прогонов.
+    # script: {номер кадра: [("down" | "up" | "tap", клавиша), ...]}
+    def __init__(self, script=None):
+        self.script = script or {}
+        self.frame = -1
+        self.held = set()
+        self.pending = []
+
+    def press(self, key):
+        self.held.add(key)
+        self.pending.append(pygame.event.Event(KEYDOWN, key=key))
+
+    def release(self, key):
+        self.held.discard(key)
+        self.pending.append(pygame.event.Event(KEYUP, key=key))
+
+    def tap(self, key):
+        self.pending.append(pygame.event.Event(KEYDOWN, key=key))
+
+    def quit(self):
+        self.pending.append(pygame.event.Event(QUIT))
+
+    def advance(self):
+        self.frame += 1
+        for action, key in self.script.get(self.frame, ()):
+            if action == "down":
+                self.press(key)
+            elif action == "up":
+                self.release(key)
+            elif action == "tap":
+                self.tap(key)
+
+    def wait(self, timeout):
+        return bool(self.pending) or self.frame + 1 in self.script
+
+    def get_events(self):
+        events = self.pending
+        self.pending = []
+        return events
+
+    def get_pressed(self):
+        return HeldKeys(self.held)
+
+# Кадры эффекта удара зависят только от направления и attack_cooldown,
+# поэтому рисуются один раз и дальше только блитятся
+SLASH_ANGLES = [math.pi * i / 8 for i in range(8)]
+slash_atlas = {}
+
+def render_slash_frame(facing_right, attack_cooldown, attack_cooldown_max):
+    slash_surface = pygame.Surface((100, 100), pygame.SRCALPHA)
+
+    progress = (attack_cooldown_max - attack_cooldown) / attack_cooldown_max
+    
+    # Параметры дуги
+    radius = 40
+    if facing_right:
+        start_angle = -math.pi/4  # -45 градусов
+        end_angle = math.pi/4     # 45 градусов
+    else:
+        start_angle = 3*math.pi/4  # 135 градусов
+        end_angle = 5*math.pi/4    # 225 градусов
+
+    angles = [start_angle + (end_angle - start_angle) * progress + angle * progress
+              for angle in SLASH_ANGLES]
+    directions = [(math.cos(angle), math.sin(angle)) for angle in angles]
+
+    for i in range(4):
+        glow_radius = radius + i * 2
+        glow_points = [(50 + dx * glow_radius, 50 + dy * glow_radius) for dx, dy in directions]
+        pygame.draw.polygon(slash_surface, (255, 255, 255, 40), glow_points)
+
+    points = [(50 + dx * radius, 50 + dy * radius) for dx, dy in directions]
+    pygame.draw.polygon(slash_surface, (255, 255, 255, 255), points)
+
+    if pygame.display.get_surface() is not None:
+        slash_surface = slash_surface.convert_alpha()
+    return slash_surface
+
+def build_slash_atlas(attack_cooldown_max):
+    # Эффект виден, пока attack_cooldown > 5
+    for facing_right in (True, False):
+        for attack_cooldown in range(6, attack_cooldown_max + 1):
+            key = (facing_right, attack_cooldown, attack_cooldown_max)
+            if key not in slash_atlas:
+                slash_atlas[key] = render_slash_frame(facing_right, attack_cooldown, attack_cooldown_max)
+
+def get_slash_frame(facing_right, attack_cooldown, attack_cooldown_max):
+    key = (facing_right, attack_cooldown, attack_cooldown_max)
+    frame = slash_atlas.get(key)
+    if frame is None:
+        build_slash_atlas(attack_cooldown_max)
+        frame = slash_atlas[key]
+    return frame
+
+class SpriteVariants:
+    # Кэш вариантов кадров анимации: (кадр, направление, прозрачность) -> Surface.
+    # Исходные кадры смотрят вправо; отражённые и полупрозрачные копии
+    # создаются один раз и не меняют исходник.
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.cache = {}
+
+    @classmethod
+    def from_sheet(cls, sheet, frame_width, frame_height):
+        frames = []
+        for y in range(0, sheet.get_height() - frame_height + 1, frame_height):
+            for x in range(0, sheet.get_width() - frame_width + 1, frame_width):
+                frames.append(sheet.subsurface((x, y, frame_width, frame_height)).copy())
+        return cls(frames)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def get(self, frame, facing_right=True, alpha=255):
+        key = (frame, facing_right, alpha)
+        image = self.cache.get(key)
+        if image is None:
+            image = self.frames[frame]
+            if not facing_right:
+                image = pygame.transform.flip(image, True, False)
+            else:
+                image = image.copy()
+            if alpha != 255:
+                image.set_alpha(alpha)
+            self.cache[key] = image
+        return image
+
+    def prebuild(self, alphas=(255,)):
+        for frame in range(len(self.frames)):
+            for facing_right in (True, False):
+                for alpha in alphas:
+                    self.get(frame, facing_right, alpha)
+
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
         
         try:
-            self.original_image = pygame.image.load(SPRITE_PATH)
-            self.original_image = pygame.transform.scale(self.original_image, (40, 60))
+            self.original_image = asset_cache.image(SPRITE_PATH, PLAYER_SIZE)
         except:
-            self.original_image = pygame.Surface((40, 60))
+            self.original_image = pygame.Surface(PLAYER_SIZE)
             self.original_image.fill(WHITE)
         
-        self.image = self.original_image
+        # Мигание при неуязвимости
+        self.blink_alpha = 128
+        self.variants = SpriteVariants([self.original_image])
+        self.variants.prebuild((255, self.blink_alpha))
+        self.animation_frame = 0
+
+        self.image = self.variants.get(0)
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
         
+        # Границы мира, за которые игрок не выходит
+        self.bounds = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+
         self.velocity_x = 0
         self.velocity_y = 0
         self.jumping = False
@@ -63,9 +334,8 @@ class Player(pygame.sprite.Sprite):
         
         # Параметры для анимации атаки
         self.attack_frame = 0
-        self.attack_angles = []  # Углы для дуги атаки
-        for i in range(8):
-            self.attack_angles.append(math.pi * i / 8)
+        self.attack_angles = SLASH_ANGLES  # Углы для дуги атаки
+        build_slash_atlas(self.attack_cooldown_max)
         
         self.max_health = 5
         self.health = self.max_health
@@ -80,37 +350,55 @@ class Player(pygame.sprite.Sprite):
         self.velocity_y += self.gravity
         self.rect.y += self.velocity_y
         
-        if self.rect.bottom > WINDOW_HEIGHT - 50:
-            self.rect.bottom = WINDOW_HEIGHT - 50
+        if self.rect.bottom > self.bounds.bottom - 50:
+            self.rect.bottom = self.bounds.bottom - 50
             self.velocity_y = 0
             self.jumping = False
 
-        if self.rect.left < 0:
-            self.rect.left = 0
-        if self.rect.right > WINDOW_WIDTH:
-            self.rect.right = WINDOW_WIDTH
+        if self.rect.left < self.bounds.left:
+            self.rect.left = self.bounds.left
+        if self.rect.right > self.bounds.right:
+            self.rect.right = self.bounds.right
             
         if self.attack_cooldown > 0:
             self.attack_cooldown -= 1
             if self.attack_cooldown == 0:
                 self.attacking = False
             
+        alpha = 255
         if self.invulnerable > 0:
             self.invulnerable -= 1
             if self.invulnerable % 10 < 5:
-                self.image.set_alpha(128)
-            else:
-                self.image.set_alpha(255)
-        else:
-            self.image.set_alpha(255)
+                alpha = self.blink_alpha
             
        
         if self.facing_right:
             self.attack_rect.midleft = self.rect.midright
-            self.image = self.original_image
         else:
             self.attack_rect.midright = self.rect.midleft
-            self.image = pygame.transform.flip(self.original_image, True, False)
+        self.image = self.variants.get(self.animation_frame, self.facing_right, alpha)
+
+    def set_animation_frame(self, frame):
+        self.animation_frame = frame % len(self.variants)
+
+    def pack_state(self):
+        return PLAYER_STATE.pack(
+            self.rect.x, self.rect.y, self.attack_rect.x, self.attack_rect.y,
+            self.velocity_x, self.velocity_y, self.gravity,
+            self.jumping, self.attacking, self.attack_cooldown, self.facing_right,
+            self.health, self.max_health, self.invulnerable, self.attack_cooldown_max,
+            self.speed, self.jump_power, float(self.animation_frame))
+
+    def restore_state(self, data, offset):
+        (self.rect.x, self.rect.y, self.attack_rect.x, self.attack_rect.y,
+         self.velocity_x, self.velocity_y, self.gravity,
+         self.jumping, self.attacking, self.attack_cooldown, self.facing_right,
+         self.health, self.max_health, self.invulnerable, self.attack_cooldown_max,
+         self.speed, self.jump_power, animation_frame) = PLAYER_STATE.unpack_from(data, offset)
+        self.animation_frame = int(animation_frame)
+        alpha = self.blink_alpha if self.invulnerable > 0 and self.invulnerable % 10 < 5 else 255
+        self.image = self.variants.get(self.animation_frame, self.facing_right, alpha)
+        return offset + PLAYER_STATE.size
 
     def jump(self):
         if not self.jumping:
@@ -145,57 +433,29 @@ class Player(pygame.sprite.Sprite):
     def is_alive(self):
         return self.health > 0
 
-    def draw_attack_effect(self, screen):
+    def draw_attack_effect(self, screen, offset=(0, 0), scale=1.0):
         if self.attacking and self.attack_cooldown > 5:
-            slash_surface = pygame.Surface((100, 100), pygame.SRCALPHA)
+            slash_surface = get_slash_frame(self.facing_right, self.attack_cooldown, self.attack_cooldown_max)
+            x = self.rect.centerx + offset[0]
+            y = self.rect.centery + offset[1]
 
-            progress = (self.attack_cooldown_max - self.attack_cooldown) / self.attack_cooldown_max
-            
-            # Параметры дуги
-            radius = 40
             if self.facing_right:
-                start_angle = -math.pi/4  # -45 градусов
-                end_angle = math.pi/4     # 45 градусов
+                x -= 20
             else:
-                start_angle = 3*math.pi/4  # 135 градусов
-                end_angle = 5*math.pi/4    # 225 градусов
-            
-           
-            points = []
-            for angle in self.attack_angles:
-                current_angle = start_angle + (end_angle - start_angle) * progress + angle * progress
-                x = 50 + math.cos(current_angle) * radius
-                y = 50 + math.sin(current_angle) * radius
-                points.append((x, y))
-            
-            if len(points) > 2:
-                
-                for i in range(4):
-                    glow_radius = radius + i * 2
-                    glow_points = []
-                    for angle in self.attack_angles:
-                        current_angle = start_angle + (end_angle - start_angle) * progress + angle * progress
-                        x = 50 + math.cos(current_angle) * glow_radius
-                        y = 50 + math.sin(current_angle) * glow_radius
-                        glow_points.append((x, y))
-                    
-                    pygame.draw.polygon(slash_surface, (255, 255, 255, 40), glow_points)
-                
-                
-                pygame.draw.polygon(slash_surface, (255, 255, 255, 255), points)
+                x -= 80
+            return screen.blit(scaled_surface(slash_surface, scale), (int(x * scale), int((y - 50) * scale)))
+        return None
 
-           
-            if self.facing_right:
-                screen.blit(slash_surface, (self.rect.centerx - 20, self.rect.centery - 50))
-            else:
-                screen.blit(slash_surface, (self.rect.centerx - 80, self.rect.centery - 50))
+def make_enemy_image():
+    image = pygame.Surface((30, 30), pygame.SRCALPHA)
+    image.fill(RED)
+    return image
 
 class Enemy(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
         
-        self.image = pygame.Surface((30, 30), pygame.SRCALPHA)
-        self.image.fill(RED)
+        self.image = make_enemy_image()
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
@@ -232,10 +492,7 @@ class Boss(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
         
-        boss_image_path = os.path.join(GAME_DIR, "assets", "pngwing.com.png")
-
-        self.image = pygame.image.load(boss_image_path).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (140, 140))
+        self.image = asset_cache.image(BOSS_SPRITE_PATH, BOSS_SIZE)
          
 
         self.rect = self.image.get_rect()
@@ -274,6 +531,15 @@ class Boss(pygame.sprite.Sprite):
     def is_alive(self):
         return self.health > 0
 
+    def pack_state(self):
+        return BOSS_STATE.pack(self.alive(), self.rect.x, self.rect.y, self.health,
+                               self.max_health, self.attack_cooldown, self.attack_cooldown_max)
+
+    def restore_state(self, data, offset):
+        (in_groups, self.rect.x, self.rect.y, self.health, self.max_health,
+         self.attack_cooldown, self.attack_cooldown_max) = BOSS_STATE.unpack_from(data, offset)
+        return in_groups, offset + BOSS_STATE.size
+
     def spawn_boss(self):
        
         x = WINDOW_WIDTH // 2 - (120 // 2) 
@@ -286,16 +552,20 @@ class Boss(pygame.sprite.Sprite):
     
         pass
 
+def make_projectile_image():
+    image = pygame.Surface((15, 15), pygame.SRCALPHA)
+    image.fill(YELLOW) 
+    pygame.draw.circle(image, WHITE, (7, 7), 5) 
+    return image
+
 class Projectile(pygame.sprite.Sprite):
     def __init__(self, x, y, target_x, target_y):
         super().__init__()
-        self.image = pygame.Surface((15, 15), pygame.SRCALPHA)
-        self.image.fill(YELLOW) 
-        pygame.draw.circle(self.image, WHITE, (7, 7), 5) 
+        self.image = make_projectile_image()
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
         
-        self.speed = 5
+        self.speed = PROJECTILE_SPEED
         
       
         dx = target_x - x
@@ -363,112 +633,399 @@ class Platform(pygame.sprite.Sprite):
         pygame.draw.rect(self.image, highlight_color, (width - 20, center_y - 2, 10, 4))
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    def __init__(self, headless=False, input_source=None, dirty_rects=False, idle_fps=IDLE_FPS,
+                 level_path=None, capture_seconds=0, lazy_world=False, render_fps=FPS,
+                 swept_collisions=True, render_scale=1.0, present_mode="native", display_size=None,
+                 fullscreen=False, dynamic_resolution=False, audio=None):
+        self.startup = StartupReport(STARTUP_T0)
+        self.startup.mark("imports")
+        self.headless = headless
+        # При lazy_world уровень и босс строятся после первого кадра меню
+        self.lazy_world = lazy_world
+        self.world_ready = False
+        # Большой уровень из файла, подгружаемый чанками вокруг игрока
+        self.level_path = level_path
+        self.level = None
+        # Вывод на экран только изменившихся областей вместо flip()
+        self.dirty_rects = dirty_rects
+        self.full_redraw = True
+        self.last_drawn = []
+        self.frame_dirty = None
+        # Меню, пауза и экран проигрыша рисуются один раз и дальше ждут ввода
+        self.idle_fps = idle_fps
+        self.frozen_state = None
+        self.idle_stats = {"rendered": 0, "presented": 0, "skipped": 0}
+        self.print_startup_report = False
+        # Столкновения по пути за тик (без проскакивания) или по перекрытию в конце тика
+        self.swept_collisions = swept_collisions
+        # Кадры рисуются с частотой render_fps (0 - без ограничения),
+        # между тиками позиции интерполируются
+        self.render_fps = render_fps
+        self.accumulator = 0.0
+        self.last_time = None
+        self.previous_positions = None
+        self.rates = {"tick": 0.0, "render": 0.0, "dropped_ticks": 0}
+        self.rate_counts = [0, 0]
+        self.rate_start = time.perf_counter()
+        # F3 - профайлер с графиком кадра, F4 - выгрузка trace в JSON
+        self.profiler = FrameProfiler(budget_ms=1000.0 / FPS)
+        # Запись геймплея: F9 - сохранить последние секунды, F10 - непрерывная запись
+        self.recorder = None
+        if capture_seconds > 0:
+            self.recorder = FrameRecorder((WINDOW_WIDTH, WINDOW_HEIGHT), seconds=capture_seconds,
+                                         game_fps=render_fps or FPS)
+        if headless:
+            # Окно не нужно, но convert()/convert_alpha() требуют видеорежим
+            if pygame.display.get_init() and pygame.display.get_driver() != "dummy":
+                pygame.display.quit()
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        init_subsystems()
+        self.startup.mark("subsystems")
+        self.input = input_source or (ScriptedInput() if headless else LiveInput())
+        self.frame_count = 0
+        # Всё рисуется в логических координатах WINDOW_WIDTH x WINDOW_HEIGHT
+        # на холст внутреннего разрешения, который RenderTarget выводит на экран
+        self.target = RenderTarget((WINDOW_WIDTH, WINDOW_HEIGHT), present_mode, display_size, fullscreen,
+                                   render_scale, dynamic_resolution, 1000.0 / (render_fps or FPS))
+        self.target.changed = False
+        self.screen = self.target.canvas
         pygame.display.set_caption("Hollow Knight Clone")
         self.clock = pygame.time.Clock()
+        self.startup.mark("display")
         self.font = pygame.font.Font(None, 36)
+        self.text_cache = TextCache()
+        self.boss_hp_label = HudText(self.text_cache, self.font,
+                                     lambda: (self.boss.health, self.boss.max_health),
+                                     "Босс: {}/{}", WHITE)
+        self.startup.mark("font")
+        # Звук по умолчанию только в окне; headless-прогоны идут без микшера
+        self.sound = SoundSystem(enabled=not headless if audio is None else audio,
+                                 sounds_dir=os.path.join(GAME_DIR, "sounds"))
+        self.startup.mark("audio")
+        # Декодирование PNG идёт в фоне, пока показывается меню
+        asset_cache.preload(PRELOAD_ASSETS)
         self.state = GameState.MENU
         self.running = True
+        if not self.lazy_world:
+            self.ensure_world()
+
+    def set_render_scale(self, scale):
+        self.target.set_scale(scale)
+        self.apply_render_scale()
+
+    def apply_render_scale(self):
+        # Новый холст: фон и все грязные области нужно перерисовать заново
+        self.target.changed = False
+        self.screen = self.target.canvas
+        self.full_redraw = True
+        self.last_drawn = []
+        self.frozen_state = None
+        if self.world_ready:
+            self.invalidate_static_layer()
+
+    def blit_logical(self, surface, rect):
+        # Картинка, размещённая в логических координатах, на холст внутреннего разрешения
+        return self.screen.blit(scaled_surface(surface, self.target.scale), self.target.to_canvas(rect))
+
+    def ensure_world(self):
+        if self.world_ready:
+            return
         self.init_game()
+        self.world_ready = True
+        self.startup.mark("world")
 
     def init_game(self):
         self.all_sprites = pygame.sprite.Group()
         self.enemies = pygame.sprite.Group() 
+        # Обычные враги из spawn_enemies: одна волна в массивах вместо спрайтов
+        self.enemy_wave = EnemyWave(make_enemy_image().convert_alpha())
         self.platforms = pygame.sprite.Group()
-        self.projectiles = pygame.sprite.Group() 
+        # Снаряды босса живут в массивах пула, а не в группах спрайтов
+        self.projectiles = ProjectilePool(make_projectile_image().convert_alpha(),
+                                          (WINDOW_WIDTH, WINDOW_HEIGHT), PROJECTILE_SPEED)
+        # Эффекты: попадания, приземления, урон боссу
+        self.particles = ParticleSystem()
+        # Всё, что не входит в статичный слой фона
+        self.moving_sprites = pygame.sprite.Group()
+        self.static_layer = None
+        self.static_layer_size = None
+        self.static_layer_has_platforms = False
+        self.full_redraw = True
+        self.camera = Camera((WINDOW_WIDTH, WINDOW_HEIGHT), (0, 0, WINDOW_WIDTH, WINDOW_HEIGHT))
+        # Broadphase: статичная сетка платформ и пересобираемые каждый кадр индексы
+        self.platform_grid = SpatialHash(STATIC_CELL_SIZE)
+        self.enemy_index = DynamicIndex()
         
         self.player = Player(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 110)
         self.all_sprites.add(self.player)
+        self.moving_sprites.add(self.player)
+        # Локальный игрок всегда первый; остальные - участники сетевого кооператива
+        self.players = [self.player]
         
        
-        self.create_level_platforms()
+        if self.level_path:
+            self.load_level(self.level_path)
+        else:
+            self.create_level_platforms()
         
         
         self.spawn_boss()
 
+    def spawn_point(self):
+        # Левый верхний угол игрока при появлении: из файла уровня или у пола первого экрана
+        if self.level is not None:
+            return self.level.spawn
+        return WINDOW_WIDTH // 2, WINDOW_HEIGHT - 110
+
+    def add_player(self, x, y):
+        player = Player(x, y)
+        # Границы мира те же, что у основного игрока (при загруженном уровне - весь уровень)
+        player.bounds = self.player.bounds.copy()
+        self.all_sprites.add(player)
+        self.moving_sprites.add(player)
+        self.players.append(player)
+        return player
+
     def spawn_boss(self):
        
         x = WINDOW_WIDTH // 2 - (120 // 2) 
         y = WINDOW_HEIGHT // 2 - (120 // 2) 
         self.boss = Boss(x, y)
         self.all_sprites.add(self.boss)
+        self.moving_sprites.add(self.boss)
         self.enemies.add(self.boss)
+        self.enemy_index.insert(self.boss)
     
 
     def boss_spawn_projectile(self):
         pass
 
     def create_level_platforms(self):
-       
-        ground = Platform(0, WINDOW_HEIGHT - 50, WINDOW_WIDTH, 50)
-        self.all_sprites.add(ground)
-        self.platforms.add(ground)
-        
-       
-        self.add_platform(50, WINDOW_HEIGHT - 180, 100, 20)
-        self.add_platform(WINDOW_WIDTH / 2 - 75, WINDOW_HEIGHT - 180, 150, 20) 
-        self.add_platform(WINDOW_WIDTH - 200, WINDOW_HEIGHT - 180, 150, 20) 
-        
-       
-        self.add_platform(200, WINDOW_HEIGHT - 300, 120, 20) 
-        self.add_platform(WINDOW_WIDTH - 320, WINDOW_HEIGHT - 300, 120, 20) 
-
-        self.add_platform(100, WINDOW_HEIGHT - 420, 80, 20) 
-        self.add_platform(WINDOW_WIDTH / 2 - 40, WINDOW_HEIGHT - 420, 80, 20) 
-        self.add_platform(WINDOW_WIDTH - 180, WINDOW_HEIGHT - 420, 80, 20)
-
-        self.add_platform(50, WINDOW_HEIGHT - 300, 100, 60) 
+        for x, y, width, height in default_level_platforms():
+            self.add_platform(x, y, width, height)
 
     def add_platform(self, x, y, width, height):
         platform = Platform(x, y, width, height)
         self.all_sprites.add(platform)
         self.platforms.add(platform)
+        self.platform_grid.insert(platform)
+        self.platforms_changed()
+        return platform
+
+    def remove_platform(self, platform):
+        platform.kill()
+        self.platform_grid.remove(platform)
+        self.platforms_changed()
+
+    def load_level(self, path):
+        if self.level is not None:
+            self.level.close()
+        self.level = ChunkedLevel(path)
+        # id платформы -> [спрайт, число загруженных чанков, где она есть]
+        self.level_platforms = {}
+        world = pygame.Rect(self.level.world_rect())
+        self.player.bounds = world
+        self.player.rect.topleft = self.level.spawn
+        self.projectiles.bounds = world.size
+        self.camera.set_world(world)
+        self.camera.center_on(self.player.rect)
+        self.invalidate_static_layer()
+        self.stream_level()
+
+    def stream_level(self):
+        if self.level is None:
+            return
+        loaded, evicted = self.level.update(*self.player.rect.center)
+        for chunk in loaded:
+            for platform_id, x, y, width, height in chunk.platforms:
+                entry = self.level_platforms.get(platform_id)
+                if entry is None:
+                    self.level_platforms[platform_id] = [self.add_platform(x, y, width, height), 1]
+                else:
+                    entry[1] += 1
+        for chunk in evicted:
+            for platform_id, *_ in chunk.platforms:
+                entry = self.level_platforms[platform_id]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self.remove_platform(entry[0])
+                    del self.level_platforms[platform_id]
 
     def spawn_enemies(self, count):
-       
-        pass
+        floor = self.player.bounds.bottom - 50
+        xs = [random.randint(self.player.bounds.left, self.player.bounds.right - 30) for _ in range(count)]
+        self.enemy_wave.spawn(xs, floor - 30)
+
+    def snapshot(self):
+        # Компактный бинарный снимок всей симуляции. Частицы и звук в него не
+        # входят: это только оформление, на ход игры они не влияют
+        enemies = [enemy for enemy in self.enemies if not isinstance(enemy, Boss)]
+        enemy_state = np.array([(enemy.rect.x, enemy.rect.y, enemy.speed, enemy.direction,
+                                 enemy.movement_counter, enemy.health, enemy.attack_cooldown)
+                                for enemy in enemies], dtype=np.float64).reshape(-1, ENEMY_FIELDS)
+        version, internal, gauss_next = random.getstate()
+        parts = [
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.state.value, self.frame_count,
+                                 len(enemies), len(self.enemy_wave), len(self.projectiles),
+                                 len(self.players)),
+            RNG_STATE.pack(version, *internal),
+            struct.pack("<d?", gauss_next or 0.0, gauss_next is not None),
+            b"".join(PLAYER_IN_WORLD.pack(player.alive()) + player.pack_state() for player in self.players),
+            self.boss.pack_state(),
+            enemy_state.tobytes(),
+            self.enemy_wave.pack_state(),
+            self.projectiles.pack_state(),
+        ]
+        return b"".join(parts)
+
+    def restore(self, data):
+        (magic, state, frame_count, enemy_count, wave_count,
+         projectile_count, player_count) = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("not a game snapshot")
+        offset = SNAPSHOT_HEADER.size
+        self.state = GameState(state)
+        self.frame_count = frame_count
+
+        version, *internal = RNG_STATE.unpack_from(data, offset)
+        offset += RNG_STATE.size
+        gauss_next, has_gauss = struct.unpack_from("<d?", data, offset)
+        offset += struct.calcsize("<d?")
+        random.setstate((version, tuple(internal), gauss_next if has_gauss else None))
+
+        offset = self.restore_players(data, offset, player_count)
+
+        boss_in_groups, offset = self.boss.restore_state(data, offset)
+        if boss_in_groups and not self.boss.alive():
+            self.all_sprites.add(self.boss)
+            self.moving_sprites.add(self.boss)
+            self.enemies.add(self.boss)
+        elif not boss_in_groups:
+            self.boss.kill()
+
+        size = enemy_count * ENEMY_FIELDS * 8
+        enemy_state = np.frombuffer(data, dtype=np.float64, count=enemy_count * ENEMY_FIELDS,
+                                    offset=offset).reshape(-1, ENEMY_FIELDS)
+        offset += size
+        self.restore_enemies(enemy_state)
+        offset = self.enemy_wave.restore_state(data, offset, wave_count)
+
+        offset = self.projectiles.restore_state(data, offset, projectile_count)
+
+        self.rebuild_dynamic_indexes()
+        self.stream_level()
+        self.full_redraw = True
+        return offset
+
+    def restore_players(self, data, offset, count):
+        # Первый игрок - всегда self.player; лишние участники кооператива удаляются, недостающие создаются
+        for player in self.players[count:]:
+            player.kill()
+        del self.players[max(1, count):]
+        while len(self.players) < count:
+            self.add_player(0, 0)
+        for player in self.players:
+            (in_groups,) = PLAYER_IN_WORLD.unpack_from(data, offset)
+            offset = player.restore_state(data, offset + PLAYER_IN_WORLD.size)
+            if in_groups and not player.alive():
+                self.all_sprites.add(player)
+                self.moving_sprites.add(player)
+            elif not in_groups:
+                player.kill()
+        return offset
+
+    def restore_enemies(self, enemy_state):
+        # Существующие спрайты переиспользуются, чтобы не создавать поверхности заново
+        enemies = [enemy for enemy in self.enemies if not isinstance(enemy, Boss)]
+        for enemy in enemies[len(enemy_state):]:
+            enemy.kill()
+        for _ in range(len(enemy_state) - len(enemies)):
+            enemy = Enemy(0, 0)
+            self.all_sprites.add(enemy)
+            self.moving_sprites.add(enemy)
+            self.enemies.add(enemy)
+            enemies.append(enemy)
+        for enemy, (x, y, speed, direction, movement_counter, health, attack_cooldown) in zip(enemies, enemy_state.tolist()):
+            enemy.rect.x = int(x)
+            enemy.rect.y = int(y)
+            enemy.speed = speed
+            enemy.direction = int(direction)
+            enemy.movement_counter = movement_counter
+            enemy.health = int(health)
+            enemy.attack_cooldown = int(attack_cooldown)
 
     def handle_menu_events(self):
-        for event in pygame.event.get():
+        for event in self.input.get_events():
             if event.type == QUIT:
                 self.running = False
             elif event.type == KEYDOWN:
                 if event.key == K_RETURN:
+                    self.ensure_world()
                     self.state = GameState.PLAYING
                 elif event.key == K_ESCAPE:
                     self.running = False
 
     def handle_playing_events(self):
-        for event in pygame.event.get():
+        for event in self.input.get_events():
             if event.type == QUIT:
                 self.running = False
             elif event.type == KEYDOWN:
                 if event.key == K_SPACE:
                     self.player.jump()
                 elif event.key == K_x:
-                    if self.player.attack():
-                       
-                        hits = pygame.sprite.spritecollide(self.player, self.enemies, False)
-                        for enemy in hits:
-                            if isinstance(enemy, Boss):
-                                enemy.take_damage()
-                            else:
-                                enemy.kill()
+                    self.player_attack(self.player)
                 elif event.key == K_ESCAPE:
                     self.state = GameState.PAUSED
+                elif event.key == K_F3:
+                    self.profiler.toggle()
+                    self.full_redraw = True
+                elif event.key == K_F4 and self.profiler.events:
+                    path = os.path.join(GAME_DIR, time.strftime("trace_%Y%m%d_%H%M%S.json"))
+                    count = self.profiler.export_chrome_trace(path)
+                    print(f"Trace: {count} событий -> {path}")
+                elif event.key == K_F9 and self.recorder is not None:
+                    path = os.path.join(GAME_DIR, time.strftime("capture_%Y%m%d_%H%M%S.hkrec"))
+                    count = self.recorder.save_last(path)
+                    print(f"Запись: {count} кадров -> {path}")
+                elif event.key == K_F10 and self.recorder is not None:
+                    if self.recorder.streaming:
+                        self.recorder.stop_stream()
+                    else:
+                        self.recorder.start_stream(os.path.join(GAME_DIR, time.strftime("stream_%Y%m%d_%H%M%S.hkrec")))
             elif event.type == KEYUP:  
                 if event.key in [K_LEFT, K_RIGHT, K_a, K_d]:  
                     self.player.stop() 
 
-        keys = pygame.key.get_pressed()
+        keys = self.input.get_pressed()
         if keys[K_LEFT]:
             self.player.move_left()
         if keys[K_RIGHT]:
             self.player.move_right()
 
+    def player_attack(self, player):
+        if not player.attack():
+            return False
+        self.sound.play("attack")
+       
+        hits = self.enemy_index.query_sprites(player.rect)
+        for enemy in hits:
+            if isinstance(enemy, Boss):
+                hit = player.rect.clip(enemy.rect)
+                self.particles.emit("boss_hit", hit.centerx, hit.centery)
+                was_alive = enemy.is_alive()
+                if enemy.take_damage():
+                    # Звук смерти - только на ударе, который добил босса
+                    if was_alive:
+                        self.sound.play("death")
+                else:
+                    self.sound.play("boss_hurt")
+            else:
+                enemy.kill()
+        self.enemy_wave.kill_in(player.rect)
+        return True
+
     def handle_paused_events(self):
-        for event in pygame.event.get():
+        for event in self.input.get_events():
             if event.type == QUIT:
                 self.running = False
             elif event.type == KEYDOWN:
@@ -479,7 +1036,7 @@ class Game:
                     self.state = GameState.PLAYING
 
     def handle_game_over_events(self):
-        for event in pygame.event.get():
+        for event in self.input.get_events():
             if event.type == QUIT:
                 self.running = False
             elif event.type == KEYDOWN:
@@ -491,96 +1048,276 @@ class Game:
 
     def check_attack_collision(self):
         
-        for entity in self.enemies: 
-            if self.player.attack_rect.colliderect(entity.rect):
-                if isinstance(entity, Boss): 
-                    if entity.take_damage():
-                        entity.kill()
-                        
-                        print("Босс побежден!")
-                        
-                        self.state = GameState.GAME_OVER 
+        for entity in self.enemy_index.query_sprites(self.player.attack_rect):
+            if isinstance(entity, Boss): 
+                hit = self.player.attack_rect.clip(entity.rect)
+                self.particles.emit("boss_hit", hit.centerx, hit.centery)
+                if entity.take_damage():
+                    entity.kill()
+                    self.sound.play("death")
+                    
+                    print("Босс побежден!")
+                    
+                    self.state = GameState.GAME_OVER 
+                else:
+                    self.sound.play("boss_hurt")
+
+    def rebuild_dynamic_indexes(self):
+        self.enemy_index.rebuild(self.enemies)
+
+    def query_level_platforms(self, rect):
+        # Сетка коллизий чанков отсекает пустые области уровня без обращения к platform_grid
+        if self.level is not None and not self.level.any_solid(rect):
+            return []
+        return self.platform_grid.query(rect)
+
+    def collide_player(self, player):
+        # Перекрытие в конце тика: при большой скорости игрок проходит платформу насквозь
+        player_on_ground = False
+        for platform in self.query_level_platforms(player.rect):
+            if player.velocity_y > 0 and player.rect.bottom <= platform.rect.bottom:
+                player.rect.bottom = platform.rect.top
+                player.velocity_y = 0
+                player.jumping = False
+                player_on_ground = True
+        return player_on_ground
+
+    def sweep_player(self, player, start):
+        # Движение за тик повторяется от start с остановкой на первой же
+        # платформе по пути, так что скорость падения не ограничена толщиной платформ
+        end = player.rect.topleft
+        player.rect.topleft = start
+        dx = end[0] - start[0]
+        dy = end[1] - start[1]
+        path = player.rect.union(player.rect.move(dx, dy))
+        obstacles = [platform.rect for platform in self.query_level_platforms(path)]
+        player_on_ground = False
+        for normal, _ in move_and_slide(player.rect, dx, dy, obstacles, PLATFORM_FACES):
+            if normal == TOP:
+                player.velocity_y = 0
+                player.jumping = False
+                player_on_ground = True
+        return player_on_ground
+
+    def boss_target(self):
+        # Босс стреляет в ближайшего живого игрока
+        living = [player for player in self.players if player.is_alive()]
+        return min(living, key=lambda player: (player.rect.centerx - self.boss.rect.centerx) ** 2 +
+                   (player.rect.centery - self.boss.rect.centery) ** 2)
 
     def update_playing(self):
-        if not self.player.is_alive():
+        died = False
+        if len(self.players) > 1:
+            for player in self.players:
+                if not player.is_alive() and player.alive():
+                    # Погибший участник кооператива выбывает, остальные продолжают
+                    player.kill()
+                    died = True
+        # Один звук смерти за тик, даже если последний игрок выбыл и игра окончена
+        if died:
+            self.sound.play("death")
+        if not any(player.is_alive() for player in self.players):
             self.state = GameState.GAME_OVER
+            if not died:
+                self.sound.play("death")
             return
             
+        profiler = self.profiler
+        profiler.begin("update.sprites")
+        # До движения: скорость падения, позиция и здоровье каждого игрока
+        before = [(player, player.velocity_y + player.gravity, player.rect.topleft, player.health)
+                  for player in self.players if player.alive()]
         self.all_sprites.update()
+        self.enemy_wave.update()
+        self.projectiles.update()
+        self.stream_level()
+        profiler.end()
         
     
+        profiler.begin("update.boss_attack")
         if self.boss.is_alive() and self.boss.should_attack():
-            bx, by, tx, ty = self.boss.get_attack_target(self.player.rect)
-            projectile = Projectile(bx, by, tx, ty)
-            self.all_sprites.add(projectile)
-            self.projectiles.add(projectile)
+            bx, by, tx, ty = self.boss.get_attack_target(self.boss_target().rect)
+            self.projectiles.spawn(bx, by, tx, ty)
+            self.sound.play("projectile")
             self.boss.reset_attack_cooldown()
+        profiler.end()
 
+        profiler.begin("update.collisions")
+        self.rebuild_dynamic_indexes()
+        for player, fall_speed, start, health in before:
+            self.update_player_collisions(player, fall_speed, start, health)
+        profiler.end()
+
+        profiler.begin("update.particles")
+        self.particles.update()
+        profiler.end()
+
+    def update_player_collisions(self, player, fall_speed, start, health):
       
-        player_on_ground = False
-        player_hits_platforms = pygame.sprite.spritecollide(self.player, self.platforms, False)
-        for platform in player_hits_platforms:
-      
-            if self.player.velocity_y > 0 and self.player.rect.bottom <= platform.rect.bottom:
-                self.player.rect.bottom = platform.rect.top
-                self.player.velocity_y = 0
-                self.player.jumping = False
-                player_on_ground = True
+        if self.swept_collisions:
+            player_on_ground = self.sweep_player(player, start)
+        else:
+            player_on_ground = self.collide_player(player)
+        player_dx = player.rect.x - start[0]
+        player_dy = player.rect.y - start[1]
+
+        # Скорость обнуляется только при приземлении - на платформу или на пол
+        if fall_speed >= LANDING_DUST_SPEED and player.velocity_y == 0:
+            self.particles.emit("landing", player.rect.centerx, player.rect.bottom)
         
     
-        if not player_on_ground and not self.player.jumping and self.player.velocity_y == 0:
-            self.player.velocity_y += self.player.gravity 
+        if not player_on_ground and not player.jumping and player.velocity_y == 0:
+            player.velocity_y += player.gravity 
 
 
-        hits = pygame.sprite.spritecollide(self.player, self.enemies, False)
+        hits = self.enemy_index.query_sprites(player.rect)
         for entity in hits:
             if entity.can_attack():
-                if self.player.take_damage(entity.damage):
+                if player.take_damage(entity.damage):
                     entity.attack_cooldown = entity.attack_cooldown_max
 
-     
-        for entity in self.enemies:
-            pass
-        projectile_hits = pygame.sprite.spritecollide(self.player, self.projectiles, True)
-        for projectile in projectile_hits:
-            self.player.take_damage(1)
+        if self.swept_collisions:
+            attacker = self.enemy_wave.sweep_attacker(player.rect, player_dx, player_dy)
+        else:
+            attacker = self.enemy_wave.contact_attacker(player.rect)
+        if attacker is not None:
+            if player.take_damage(int(self.enemy_wave.damage[attacker])):
+                self.enemy_wave.reset_attack_cooldown(attacker)
+
+        if self.swept_collisions:
+            projectile_hits = self.projectiles.sweep_rect(player.rect, player_dx, player_dy)
+        else:
+            projectile_hits = self.projectiles.collide_rect(player.rect)
+        for _ in range(projectile_hits):
+            player.take_damage(1)
+        if projectile_hits:
+            self.particles.emit("player_hit", player.rect.centerx, player.rect.centery)
+        if player.health < health:
+            self.sound.play("player_hurt")
+
+    def render_text(self, text, color):
+        return self.text_cache.render(self.font, text, True, color)
 
     def draw_menu(self):
         self.screen.fill(BLACK)
         
-        title = self.font.render("Hollow Knight Clone", True, WHITE)
-        start_text = self.font.render("Нажмите ENTER для начала игры", True, YELLOW)
-        exit_text = self.font.render("ESC для выхода", True, WHITE)
+        title = self.render_text("Hollow Knight Clone", WHITE)
+        start_text = self.render_text("Нажмите ENTER для начала игры", YELLOW)
+        exit_text = self.render_text("ESC для выхода", WHITE)
         
         title_rect = title.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/3))
         start_rect = start_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
         exit_rect = exit_text.get_rect(center=(WINDOW_WIDTH/2, 2*WINDOW_HEIGHT/3))
         
-        self.screen.blit(title, title_rect)
-        self.screen.blit(start_text, start_rect)
-        self.screen.blit(exit_text, exit_rect)
+        self.blit_logical(title, title_rect)
+        self.blit_logical(start_text, start_rect)
+        self.blit_logical(exit_text, exit_rect)
+
+    def invalidate_static_layer(self):
+        self.static_layer = None
+
+    def platforms_changed(self):
+        # Платформы запечены в фон только когда камера неподвижна
+        if self.static_layer_has_platforms:
+            self.invalidate_static_layer()
+
+    def build_static_layer(self):
+        # Слой рисуется в логическом размере и один раз масштабируется под холст
+        width, height = WINDOW_WIDTH, WINDOW_HEIGHT
+        layer = pygame.Surface((width, height)).convert()
 
-    def draw_playing(self):
         # Градиентный фон (от светлого к темному)
-        for y in range(WINDOW_HEIGHT):
-            r = int(200 - 150 * (y / WINDOW_HEIGHT))
-            g = int(180 - 100 * (y / WINDOW_HEIGHT))
-            b = int(220 - 120 * (y / WINDOW_HEIGHT))
-            pygame.draw.line(self.screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
-            
+        for y in range(height):
+            r = int(200 - 150 * (y / height))
+            g = int(180 - 100 * (y / height))
+            b = int(220 - 120 * (y / height))
+            pygame.draw.line(layer, (r, g, b), (0, y), (width, y))
+
         # Отрисовка имитации облаков (нижняя часть)
         for i in range(5):
             alpha = 100 - i * 15 # Чем ниже, тем прозрачнее
             cloud_color = (150, 150, 170, alpha)
-            cloud_rect = pygame.Rect(0, WINDOW_HEIGHT - 150 + i * 20, WINDOW_WIDTH, 50)
+            cloud_rect = pygame.Rect(0, height - 150 + i * 20, width, 50)
             s = pygame.Surface((cloud_rect.width, cloud_rect.height), pygame.SRCALPHA)
             s.fill(cloud_color)
-            self.screen.blit(s, (cloud_rect.x, cloud_rect.y))
+            layer.blit(s, (cloud_rect.x, cloud_rect.y))
 
-        self.all_sprites.draw(self.screen)
+        # Если уровень помещается в экран, платформы не двигаются
+        # и их можно запечь в тот же слой
+        self.static_layer_has_platforms = self.camera.is_static()
+        if self.static_layer_has_platforms:
+            self.platforms.draw(layer)
+
+        if layer.get_size() != self.screen.get_size():
+            layer = pygame.transform.smoothscale(layer, self.screen.get_size())
+        self.static_layer = layer
+        self.static_layer_size = layer.get_size()
+
+    def draw_playing(self):
+        profiler = self.profiler
+        profiler.begin("draw.background")
+        if self.camera.follow(self.player.rect):
+            self.full_redraw = True
+        if self.static_layer is None or self.static_layer_size != self.screen.get_size():
+            self.build_static_layer()
+            self.full_redraw = True
+
+        # Грязные области выводятся, только когда холст - сама поверхность окна
+        full = (self.full_redraw or not self.dirty_rects or not self.target.direct
+                or self.state != GameState.PLAYING)
+        if full:
+            self.screen.blit(self.static_layer, (0, 0))
+        else:
+            # Стираем то, что было нарисовано в прошлом кадре
+            for rect in self.last_drawn:
+                self.screen.blit(self.static_layer, rect, rect)
+
+        profiler.end()
+
+        profiler.begin("draw.sprites")
+        view = self.camera.rect
+        offset = self.camera.offset
+        scale = self.target.scale
+        to_canvas = self.target.to_canvas
+        drawn_count = 0
+        culled_count = 0
+
+        if not self.static_layer_has_platforms:
+            visible_platforms = self.platform_grid.query(view)
+            self.screen.blits([(scaled_surface(platform.image, scale), to_canvas(platform.rect.move(offset)))
+                               for platform in visible_platforms], False)
+            drawn_count += len(visible_platforms)
+            culled_count += len(self.platforms) - len(visible_platforms)
+
+        # Отсечение по окну камеры: Rect.collidelistall работает на C
+        sprites = self.moving_sprites.sprites()
+        visible_sprites = [sprites[i] for i in view.collidelistall([sprite.rect for sprite in sprites])]
+        sprite_rects = [sprite.rect.move(offset) for sprite in visible_sprites]
+        self.screen.blits([(scaled_surface(sprite.image, scale), to_canvas(rect))
+                           for sprite, rect in zip(visible_sprites, sprite_rects)], False)
+        drawn_count += len(visible_sprites)
+        culled_count += len(sprites) - len(visible_sprites)
+
+        drawn_enemies = self.enemy_wave.draw(self.screen, offset, view, scale)
+        drawn_count += drawn_enemies
+        culled_count += len(self.enemy_wave) - drawn_enemies
+
+        drawn_projectiles = self.projectiles.draw(self.screen, offset, view, scale)
+        drawn_count += drawn_projectiles
+        culled_count += len(self.projectiles) - drawn_projectiles
+
+        self.camera.drawn = drawn_count
+        self.camera.culled = culled_count
         
-        self.player.draw_attack_effect(self.screen)
+        profiler.end()
+
+        profiler.begin("draw.effects")
+        effect_rects = [player.draw_attack_effect(self.screen, offset, scale)
+                        for player in self.players if player.alive()]
+        _, particle_rect = self.particles.draw(self.screen, offset, view, scale)
+        profiler.end()
         
+        profiler.begin("draw.hud")
         # Отрисовка полоски здоровья босса
         if hasattr(self, 'boss') and self.boss.is_alive():
             boss_health_width = 300
@@ -588,82 +1325,328 @@ class Game:
             boss_health_x = WINDOW_WIDTH // 2 - boss_health_width // 2
             boss_health_y = 20
             
-            pygame.draw.rect(self.screen, RED, (boss_health_x, boss_health_y, boss_health_width, boss_health_height))
+            pygame.draw.rect(self.screen, RED, to_canvas((boss_health_x, boss_health_y, boss_health_width, boss_health_height)))
             current_boss_health_width = (self.boss.health / self.boss.max_health) * boss_health_width
-            pygame.draw.rect(self.screen, GREEN, (boss_health_x, boss_health_y, current_boss_health_width, boss_health_height))
+            pygame.draw.rect(self.screen, GREEN, to_canvas((boss_health_x, boss_health_y, current_boss_health_width, boss_health_height)))
             
-            boss_hp_text = self.font.render(f"Босс: {self.boss.health}/{self.boss.max_health}", True, WHITE)
+            boss_hp_text = self.boss_hp_label.get_surface()
             text_rect = boss_hp_text.get_rect(center=(WINDOW_WIDTH/2, boss_health_y + boss_health_height/2))
-            self.screen.blit(boss_hp_text, text_rect)
+            self.blit_logical(boss_hp_text, text_rect)
+            boss_bar_rect = pygame.Rect(boss_health_x, boss_health_y, boss_health_width, boss_health_height)
+        else:
+            boss_bar_rect = None
         
         health_width = 200
         health_height = 20
         health_x = 10
         health_y = 10
         
-        pygame.draw.rect(self.screen, RED, (health_x, health_y, health_width, health_height))
+        pygame.draw.rect(self.screen, RED, to_canvas((health_x, health_y, health_width, health_height)))
         current_health_width = (self.player.health / self.player.max_health) * health_width
-        pygame.draw.rect(self.screen, GREEN, (health_x, health_y, current_health_width, health_height))
+        pygame.draw.rect(self.screen, GREEN, to_canvas((health_x, health_y, current_health_width, health_height)))
+        profiler.end()
+
+        if self.dirty_rects:
+            drawn = sprite_rects
+            drawn.extend(self.enemy_wave.rects(offset, view))
+            drawn.extend(self.projectiles.rects(offset, view))
+            drawn.extend(rect for rect in effect_rects if rect is not None)
+            if particle_rect is not None:
+                drawn.append(particle_rect.clip(self.screen.get_rect()))
+            if boss_bar_rect is not None:
+                drawn.append(boss_bar_rect.union(text_rect))
+            drawn.append(pygame.Rect(health_x, health_y, health_width, health_height))
+            self.frame_dirty = None if full else self.last_drawn + drawn
+            self.last_drawn = drawn
+        self.full_redraw = False
 
     def draw_paused(self):
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        overlay = pygame.Surface(self.screen.get_size())
         overlay.fill(BLACK)
         overlay.set_alpha(128)
         self.screen.blit(overlay, (0, 0))
         
-        pause_text = self.font.render("ПАУЗА", True, WHITE)
-        continue_text = self.font.render("ESC - Продолжить", True, WHITE)
-        restart_text = self.font.render("R - Начать заново", True, WHITE)
+        pause_text = self.render_text("ПАУЗА", WHITE)
+        continue_text = self.render_text("ESC - Продолжить", WHITE)
+        restart_text = self.render_text("R - Начать заново", WHITE)
         
         pause_rect = pause_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/3))
         continue_rect = continue_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
         restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH/2, 2*WINDOW_HEIGHT/3))
         
-        self.screen.blit(pause_text, pause_rect)
-        self.screen.blit(continue_text, continue_rect)
-        self.screen.blit(restart_text, restart_rect)
+        self.blit_logical(pause_text, pause_rect)
+        self.blit_logical(continue_text, continue_rect)
+        self.blit_logical(restart_text, restart_rect)
 
     def draw_game_over(self):
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        overlay = pygame.Surface(self.screen.get_size())
         overlay.fill(BLACK)
         overlay.set_alpha(128)
         self.screen.blit(overlay, (0, 0))
         
-        game_over_text = self.font.render("GAME OVER", True, RED)
-        restart_text = self.font.render("R - Начать заново", True, WHITE)
-        menu_text = self.font.render("ESC - Вернуться в меню", True, WHITE)
+        game_over_text = self.render_text("GAME OVER", RED)
+        restart_text = self.render_text("R - Начать заново", WHITE)
+        menu_text = self.render_text("ESC - Вернуться в меню", WHITE)
         
         game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/3))
         restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
         menu_rect = menu_text.get_rect(center=(WINDOW_WIDTH/2, 2*WINDOW_HEIGHT/3))
         
-        self.screen.blit(game_over_text, game_over_rect)
-        self.screen.blit(restart_text, restart_rect)
-        self.screen.blit(menu_text, menu_rect)
+        self.blit_logical(game_over_text, game_over_rect)
+        self.blit_logical(restart_text, restart_rect)
+        self.blit_logical(menu_text, menu_rect)
 
-    def game_loop(self):
-        while self.running:
-            if self.state == GameState.MENU:
-                self.handle_menu_events()
+    def run_frame(self, render=True):
+        self.input.advance()
+        if self.state == GameState.MENU:
+            self.handle_menu_events()
+            if render:
                 self.draw_menu()
-            elif self.state == GameState.PLAYING:
-                self.handle_playing_events()
-                self.update_playing()
-                self.draw_playing()
-            elif self.state == GameState.PAUSED:
-                self.handle_paused_events()
+        elif self.state == GameState.PLAYING:
+            self.tick_playing()
+            if render:
+                self.render_playing()
+        elif self.state == GameState.PAUSED:
+            self.handle_paused_events()
+            if render:
                 self.draw_playing()
                 self.draw_paused()
-            elif self.state == GameState.GAME_OVER:
-                self.handle_game_over_events()
+        elif self.state == GameState.GAME_OVER:
+            self.handle_game_over_events()
+            if render:
                 self.draw_playing()
                 self.draw_game_over()
+        self.frame_count += 1
+
+    def tick_playing(self):
+        profiler = self.profiler
+        profiler.begin("events")
+        self.handle_playing_events()
+        profiler.end()
+        profiler.begin("update")
+        self.update_playing()
+        profiler.end()
+
+    def render_playing(self, alpha=None):
+        profiler = self.profiler
+        if profiler.enabled:
+            # Полупрозрачный оверлей нельзя рисовать поверх прошлого кадра
+            self.full_redraw = True
+        profiler.begin("draw")
+        if alpha is None:
+            self.draw_playing()
+        else:
+            self.draw_interpolated(alpha)
+        profiler.end()
+        if profiler.enabled:
+            rates = self.rates
+            profiler.draw_overlay(self.screen, extra=(
+                f"ticks/s {rates['tick']:5.1f}  frames/s {rates['render']:5.1f}",
+                f"dropped ticks {rates['dropped_ticks']}",
+                "canvas {}x{} ({:.2f})".format(*self.screen.get_size(), self.target.scale),
+                self.sound_overlay_line()))
 
-            pygame.display.flip()
-            self.clock.tick(FPS)
+    def sound_overlay_line(self):
+        stats = self.sound.stats()
+        if "dispatch_ms_p95" not in stats:
+            return f"sound {stats['played']} played"
+        return (f"sound p95 {stats['dispatch_ms_p95']:.2f}+{stats['buffer_ms']:.1f} ms, "
+                f"stolen {stats['stolen']} dropped {stats['dropped']}")
+
+    def save_previous_positions(self):
+        # Состояние перед тиком - начальная точка интерполяции
+        n = len(self.projectiles)
+        m = len(self.enemy_wave)
+        self.previous_positions = (
+            {sprite: sprite.rect.topleft for sprite in self.moving_sprites},
+            self.projectiles.pos[:n].copy(),
+            self.enemy_wave.x[:m].copy(),
+        )
+
+    def draw_interpolated(self, alpha):
+        # Рисует мир между предыдущим и текущим тиком: позиции временно
+        # сдвигаются назад на (1 - alpha) тика и после отрисовки возвращаются
+        if self.previous_positions is None:
+            self.draw_playing()
+            return
+        sprite_positions, projectile_pos, enemy_x = self.previous_positions
+        moved = []
+        for sprite in self.moving_sprites:
+            previous = sprite_positions.get(sprite)
+            if previous is None:
+                continue
+            x, y = sprite.rect.topleft
+            moved.append((sprite, x, y))
+            sprite.rect.topleft = (round(previous[0] + (x - previous[0]) * alpha),
+                                   round(previous[1] + (y - previous[1]) * alpha))
+        # Если снаряды или враги появились или пропали, строки массивов
+        # сдвинулись и интерполировать их нельзя
+        pos = self.projectiles.pos[:len(self.projectiles)]
+        current_pos = None
+        if len(pos) == len(projectile_pos):
+            current_pos = pos.copy()
+            pos -= (current_pos - projectile_pos) * (1.0 - alpha)
+        x = self.enemy_wave.x[:len(self.enemy_wave)]
+        current_x = None
+        if len(x) == len(enemy_x):
+            current_x = x.copy()
+            x -= (current_x - enemy_x) * (1.0 - alpha)
+
+        self.draw_playing()
+
+        for sprite, sx, sy in moved:
+            sprite.rect.topleft = (sx, sy)
+        if current_pos is not None:
+            pos[:] = current_pos
+        if current_x is not None:
+            x[:] = current_x
+
+    def run_playing_frame(self):
+        # Фиксированный шаг: тики догоняют реальное время, кадр рисуется
+        # один раз с интерполяцией между двумя последними тиками
+        now = time.perf_counter()
+        if self.last_time is None:
+            self.accumulator = TICK_SECONDS
+        else:
+            self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks = 0
+        while self.accumulator >= TICK_SECONDS and self.state == GameState.PLAYING:
+            if ticks == MAX_TICKS_PER_FRAME:
+                # Не успеваем: игра замедляется, но не уходит в спираль догоняния
+                self.rates["dropped_ticks"] += int(self.accumulator / TICK_SECONDS)
+                self.accumulator = 0.0
+                break
+            self.input.advance()
+            self.save_previous_positions()
+            self.tick_playing()
+            self.frame_count += 1
+            self.accumulator -= TICK_SECONDS
+            ticks += 1
+        if self.state != GameState.PLAYING:
+            # Пауза или проигрыш: дальше кадры рисует run_idle_frame
+            self.last_time = None
+            return
+        self.render_playing(min(1.0, self.accumulator / TICK_SECONDS))
+        self.count_rates(ticks)
+
+    def count_rates(self, ticks):
+        self.rate_counts[0] += ticks
+        self.rate_counts[1] += 1
+        now = time.perf_counter()
+        elapsed = now - self.rate_start
+        if elapsed >= 1.0:
+            self.rates["tick"] = self.rate_counts[0] / elapsed
+            self.rates["render"] = self.rate_counts[1] / elapsed
+            self.rate_counts = [0, 0]
+            self.rate_start = now
+
+    def step(self, n_frames=1, render=None):
+        # Прогон симуляции без flip() и без ограничения FPS
+        if render is None:
+            render = not self.headless
+        for _ in range(n_frames):
+            if not self.running:
+                break
+            self.run_frame(render)
+        return self.frame_count
+
+    def game_loop(self):
+        while self.running:
+            if self.state == GameState.PLAYING:
+                self.frozen_state = None
+                frame_start = time.perf_counter()
+                self.profiler.begin_frame()
+                self.run_playing_frame()
+                self.profiler.begin("present")
+                self.present()
+                self.profiler.end()
+                if self.recorder is not None:
+                    self.profiler.begin("capture")
+                    self.recorder.capture(self.target.logical_frame())
+                    self.profiler.end()
+                self.profiler.end_frame()
+                if self.target.record_frame((time.perf_counter() - frame_start) * 1000.0):
+                    self.apply_render_scale()
+                self.clock.tick(self.render_fps)
+            else:
+                self.last_time = None
+                self.run_idle_frame()
+                self.clock.tick(FPS)
+
+    def run_idle_frame(self):
+        state = self.state
+        if self.frozen_state != state:
+            # Первый кадр в статичном состоянии рисуется полностью
+            self.run_frame()
+            self.present()
+            self.frozen_state = state
+            self.idle_stats["rendered"] += 1
+            if not self.world_ready:
+                # Меню уже на экране - теперь можно собрать уровень и фон
+                self.startup.mark("first_frame")
+                self.ensure_world()
+                self.build_static_layer()
+                self.startup.mark("static_layer")
+                if self.print_startup_report:
+                    print(self.startup)
+            return
+
+        timeout = int(1000 / self.idle_fps) if self.idle_fps > 0 else 0
+        start = time.perf_counter()
+        got_input = self.input.wait(timeout)
+        elapsed = time.perf_counter() - start
+        self.idle_stats["skipped"] += max(0, int(elapsed * FPS) - 1)
+
+        if got_input:
+            self.run_frame(render=False)
+            if self.state != state:
+                self.frozen_state = None
+                return
+        # Ввод без смены состояния или тик анимации: кадр уже лежит на экране
+        self.idle_stats["skipped"] += 1
+        pygame.display.flip()
+        self.idle_stats["presented"] += 1
+
+    def present(self):
+        if self.dirty_rects and self.state == GameState.PLAYING and self.frame_dirty is not None:
+            self.target.present(self.frame_dirty)
+        else:
+            self.target.present()
+        if self.state != GameState.PLAYING:
+            # После меню, паузы или экрана проигрыша кадр нужно перерисовать целиком
+            self.full_redraw = True
+        self.frame_dirty = None
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Hollow Knight Clone")
+    parser.add_argument("level", nargs="?", help="файл уровня .hklv")
+    parser.add_argument("--dirty-rects", action="store_true")
+    parser.add_argument("--capture-seconds", type=float, default=0)
+    parser.add_argument("--startup-report", action="store_true")
+    parser.add_argument("--render-fps", type=int, default=FPS, help="0 - без ограничения")
+    parser.add_argument("--render-scale", type=float, default=1.0, help="внутреннее разрешение, доля от 800x600")
+    parser.add_argument("--present", choices=PRESENT_MODES, default="native")
+    parser.add_argument("--display-size", help="размер окна для --present integer, например 1920x1080")
+    parser.add_argument("--fullscreen", action="store_true")
+    parser.add_argument("--dynamic-resolution", action="store_true")
+    parser.add_argument("--resolution-report", action="store_true")
+    parser.add_argument("--music", help="музыка (ogg/wav), проигрывается потоком с диска")
+    parser.add_argument("--no-audio", action="store_true")
+    args = parser.parse_args()
+    display_size = tuple(int(v) for v in args.display_size.split("x")) if args.display_size else None
+    game = Game(level_path=args.level, dirty_rects=args.dirty_rects, capture_seconds=args.capture_seconds,
+                lazy_world=True, render_fps=args.render_fps, render_scale=args.render_scale,
+                present_mode=args.present, display_size=display_size, fullscreen=args.fullscreen,
+                dynamic_resolution=args.dynamic_resolution, audio=not args.no_audio)
+    game.sound.play_music(args.music)
+    game.print_startup_report = args.startup_report
     game.game_loop()
+    if args.resolution_report:
+        print(game.target.report())
+    game.sound.close()
+    if game.recorder is not None:
+        game.recorder.close()
     pygame.quit()
     sys.exit() 
\ No newline at end of file
@@ -0,0 +1,220 @@
+import mmap
+import struct
+import sys
+import time
+
+import numpy as np
+
+# Формат файла уровня (.hklv), все числа little-endian:
+#   заголовок LEVEL_HEADER
+#   таблица чанков: chunks_x * chunks_y записей CHUNK_ENTRY (по строкам)
+#   данные чанков: платформы (id, x, y, w, h как int32) и сетка коллизий
+#   (по байту на клетку cell_size x cell_size, 1 - клетка занята платформой)
+LEVEL_MAGIC = b"HKLV"
+LEVEL_VERSION = 1
+LEVEL_HEADER = struct.Struct("<4sHIIIIIIii")
+CHUNK_ENTRY = struct.Struct("<QII")
+PLATFORM_FIELDS = 5
+
+
+def chunk_range(x, y, width, height, chunk_size):
+    return (int(x) // chunk_size, int(y) // chunk_size,
+            (int(x + width) - 1) // chunk_size, (int(y + height) - 1) // chunk_size)
+
+
+def write_level(path, platforms, world_size, spawn, chunk_size=512, cell_size=32):
+    # platforms: [(x, y, w, h), ...] в мировых координатах
+    world_width, world_height = world_size
+    chunks_x = -(-world_width // chunk_size)
+    chunks_y = -(-world_height // chunk_size)
+    cells = chunk_size // cell_size
+
+    chunk_platforms = {}
+    for platform_id, (x, y, w, h) in enumerate(platforms):
+        x0, y0, x1, y1 = chunk_range(x, y, w, h, chunk_size)
+        for cx in range(max(x0, 0), min(x1, chunks_x - 1) + 1):
+            for cy in range(max(y0, 0), min(y1, chunks_y - 1) + 1):
+                chunk_platforms.setdefault((cx, cy), []).append((platform_id, x, y, w, h))
+
+    table_offset = LEVEL_HEADER.size
+    data_offset = table_offset + CHUNK_ENTRY.size * chunks_x * chunks_y
+    table = []
+    blobs = []
+    for cy in range(chunks_y):
+        for cx in range(chunks_x):
+            records = chunk_platforms.get((cx, cy), [])
+            grid = np.zeros((cells, cells), dtype=np.uint8)
+            origin_x = cx * chunk_size
+            origin_y = cy * chunk_size
+            for _, x, y, w, h in records:
+                gx0 = max(0, (int(x) - origin_x) // cell_size)
+                gy0 = max(0, (int(y) - origin_y) // cell_size)
+                gx1 = min(cells - 1, (int(x + w) - 1 - origin_x) // cell_size)
+                gy1 = min(cells - 1, (int(y + h) - 1 - origin_y) // cell_size)
+                grid[gy0:gy1 + 1, gx0:gx1 + 1] = 1
+            platform_data = np.array(records, dtype=np.int32).reshape(-1, PLATFORM_FIELDS)
+            blob = platform_data.tobytes() + grid.tobytes()
+            table.append(CHUNK_ENTRY.pack(data_offset, len(records), len(blob)))
+            blobs.append(blob)
+            data_offset += len(blob)
+
+    with open(path, "wb") as f:
+        f.write(LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, chunk_size, cell_size,
+                                  world_width, world_height, chunks_x, chunks_y,
+                                  int(spawn[0]), int(spawn[1])))
+        f.write(b"".join(table))
+        f.write(b"".join(blobs))
+
+
+class LevelChunk:
+    def __init__(self, key, platforms, grid):
+        self.key = key
+        self.platforms = platforms
+        self.grid = grid
+
+
+class ChunkedLevel:
+    # Уровень, читаемый по чанкам через mmap: в памяти держатся только
+    # чанки вокруг игрока, остальные выгружаются
+    def __init__(self, path, load_radius=1, evict_radius=2):
+        self.path = path
+        self.file = open(path, "rb")
+        self.chunks = {}
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.chunk_size, self.cell_size, self.world_width, self.world_height,
+         self.chunks_x, self.chunks_y, spawn_x, spawn_y) = LEVEL_HEADER.unpack_from(self.map, 0)
+        if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a level file")
+        self.spawn = (spawn_x, spawn_y)
+        self.cells = self.chunk_size // self.cell_size
+        self.load_radius = load_radius
+        self.evict_radius = evict_radius
+        self.center = None
+        self.load_times = []
+
+    def close(self):
+        self.chunks.clear()
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def world_rect(self):
+        return (0, 0, self.world_width, self.world_height)
+
+    def chunk_at(self, x, y):
+        return int(x) // self.chunk_size, int(y) // self.chunk_size
+
+    def load_chunk(self, key):
+        start = time.perf_counter()
+        cx, cy = key
+        entry_offset = LEVEL_HEADER.size + CHUNK_ENTRY.size * (cy * self.chunks_x + cx)
+        offset, count, _ = CHUNK_ENTRY.unpack_from(self.map, entry_offset)
+        platforms = np.frombuffer(self.map, dtype=np.int32, count=count * PLATFORM_FIELDS,
+                                  offset=offset).reshape(-1, PLATFORM_FIELDS).tolist()
+        grid_offset = offset + count * PLATFORM_FIELDS * 4
+        grid = np.frombuffer(self.map, dtype=np.uint8, count=self.cells * self.cells,
+                             offset=grid_offset).reshape(self.cells, self.cells).copy()
+        chunk = LevelChunk(key, platforms, grid)
+        self.chunks[key] = chunk
+        self.load_times.append(time.perf_counter() - start)
+        return chunk
+
+    def update(self, x, y):
+        # Возвращает (загруженные чанки, выгруженные чанки)
+        center = self.chunk_at(x, y)
+        if center == self.center:
+            return [], []
+        self.center = center
+        ccx, ccy = center
+
+        loaded = []
+        for cx in range(ccx - self.load_radius, ccx + self.load_radius + 1):
+            for cy in range(ccy - self.load_radius, ccy + self.load_radius + 1):
+                if 0 <= cx < self.chunks_x and 0 <= cy < self.chunks_y and (cx, cy) not in self.chunks:
+                    loaded.append(self.load_chunk((cx, cy)))
+
+        evicted = []
+        for key in list(self.chunks):
+            if max(abs(key[0] - ccx), abs(key[1] - ccy)) > self.evict_radius:
+                evicted.append(self.chunks.pop(key))
+        return loaded, evicted
+
+    def is_solid(self, x, y):
+        chunk = self.chunks.get(self.chunk_at(x, y))
+        if chunk is None:
+            return False
+        gx = (int(x) % self.chunk_size) // self.cell_size
+        gy = (int(y) % self.chunk_size) // self.cell_size
+        return bool(chunk.grid[gy, gx])
+
+    def any_solid(self, rect):
+        # Грубая проверка по сетке: задевает ли rect хоть одну занятую клетку.
+        # Для незагруженного чанка ответ - True, пусть решает точная проверка
+        left = max(0, int(rect.left))
+        top = max(0, int(rect.top))
+        right = min(self.world_width, int(rect.right)) - 1
+        bottom = min(self.world_height, int(rect.bottom)) - 1
+        if right < left or bottom < top:
+            return False
+        size = self.chunk_size
+        cell = self.cell_size
+        for cy in range(top // size, bottom // size + 1):
+            for cx in range(left // size, right // size + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    return True
+                gx0 = max(left - cx * size, 0) // cell
+                gy0 = max(top - cy * size, 0) // cell
+                gx1 = min(right - cx * size, size - 1) // cell
+                gy1 = min(bottom - cy * size, size - 1) // cell
+                if chunk.grid[gy0:gy1 + 1, gx0:gx1 + 1].any():
+                    return True
+        return False
+
+    def stats(self):
+        times = self.load_times
+        return {
+            "loaded_chunks": len(self.chunks),
+            "chunk_loads": len(times),
+            "last_load_ms": times[-1] * 1000.0 if times else 0.0,
+            "mean_load_ms": sum(times) / len(times) * 1000.0 if times else 0.0,
+            "max_load_ms": max(times) * 1000.0 if times else 0.0,
+        }
+
+
+def generate_platforms(world_width, world_height, seed=0):
+    # Тестовая карта: пол по всей ширине и ярусы платформ
+    import random
+    rng = random.Random(seed)
+    platforms = [(0, world_height - 50, world_width, 50)]
+    for y in range(world_height - 180, 100, -120):
+        x = rng.randint(0, 200)
+        while x < world_width - 100:
+            width = rng.randint(80, 200)
+            platforms.append((x, y, width, 20))
+            x += width + rng.randint(80, 300)
+    return platforms
+
+
+def main(argv):
+    if len(argv) < 2 or argv[0] not in ("generate", "export-default"):
+        print("usage: python levels.py generate PATH [WIDTH HEIGHT] | export-default PATH")
+        return 1
+    path = argv[1]
+    if argv[0] == "generate":
+        width = int(argv[2]) if len(argv) > 2 else 20000
+        height = int(argv[3]) if len(argv) > 3 else 3000
+        platforms = generate_platforms(width, height)
+        write_level(path, platforms, (width, height), (100, height - 110))
+    else:
+        from game import default_level_platforms, WINDOW_WIDTH, WINDOW_HEIGHT
+        platforms = default_level_platforms()
+        write_level(path, platforms, (WINDOW_WIDTH, WINDOW_HEIGHT), (WINDOW_WIDTH // 2, WINDOW_HEIGHT - 110))
+    print(f"{path}: {len(platforms)} platforms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,765 @@
+import argparse
+import multiprocessing as mp
+import os
+import random
+import socket
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+import pygame
+
+from game import Game, GameState, TICK_RATE, TICK_SECONDS
+
+# Протокол поверх UDP. Каждый пакет начинается с PACKET_HEADER (магия и тип).
+# JOIN/LEAVE - без тела; WELCOME - номер игрока и тик сервера;
+# INPUT - последний полученный клиентом тик снимка и несколько последних
+# вводов (номер, биты) с повтором, чтобы потеря одного пакета не теряла ввод;
+# SNAPSHOT - тик, тик базового снимка (NO_BASE - полный снимок), номер
+# последнего применённого ввода этого клиента, длина снимка и сжатые байты.
+NET_MAGIC = b"HK"
+MSG_JOIN, MSG_WELCOME, MSG_FULL, MSG_INPUT, MSG_SNAPSHOT, MSG_LEAVE = range(1, 7)
+PACKET_HEADER = struct.Struct("<2sB")
+WELCOME = struct.Struct("<BI")
+INPUT_HEADER = struct.Struct("<IB")
+INPUT_ENTRY = struct.Struct("<IB")
+SNAPSHOT_HEADER = struct.Struct("<IIII")
+NO_BASE = 0xFFFFFFFF
+MAX_PACKET = 65507
+
+DEFAULT_PORT = 47800
+MAX_PLAYERS = 4
+INPUT_REDUNDANCY = 4
+# Снимок уходит раз в SNAPSHOT_INTERVAL тиков; базы для дельт хранятся HISTORY_TICKS тиков
+SNAPSHOT_INTERVAL = 2
+HISTORY_TICKS = 64
+# Сколько вводов клиента сервер держит впрок; лишние старые отбрасываются,
+# чтобы очередь не копила задержку
+MAX_INPUT_BACKLOG = 8
+CLIENT_TIMEOUT = 5.0
+RESTART_TICKS = TICK_RATE * 3
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_ATTACK = 8
+
+# Квантование: координаты снарядов в 1/4 пикселя, скорости - в 1/64
+POSITION_SCALE = 4
+VELOCITY_SCALE = 64
+
+# Снимок: WORLD_DTYPE, затем игроки, враги волны и снаряды (самое
+# изменчивое - в конце, чтобы сдвиг длины не портил дельту остального)
+WORLD_DTYPE = np.dtype([("state", "u1"), ("boss_alive", "u1"), ("boss_health", "u1"),
+                        ("boss_x", "<i4"), ("boss_y", "<i4"),
+                        ("players", "u1"), ("enemies", "<u2"), ("projectiles", "<u2")])
+PLAYER_DTYPE = np.dtype([("id", "u1"), ("flags", "u1"), ("health", "u1"), ("attack_cooldown", "u1"),
+                         ("invulnerable", "u1"), ("x", "<i4"), ("y", "<i4"), ("vx", "i1"), ("vy", "<i2")])
+ENEMY_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("direction", "i1")])
+PROJECTILE_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("vx", "<i2"), ("vy", "<i2")])
+
+FLAG_FACING_RIGHT = 1
+FLAG_JUMPING = 2
+FLAG_ATTACKING = 4
+
+
+def input_bits(keys):
+    bits = 0
+    if keys[pygame.K_LEFT]:
+        bits |= INPUT_LEFT
+    if keys[pygame.K_RIGHT]:
+        bits |= INPUT_RIGHT
+    if keys[pygame.K_SPACE]:
+        bits |= INPUT_JUMP
+    if keys[pygame.K_x]:
+        bits |= INPUT_ATTACK
+    return bits
+
+
+def apply_input(player, bits, previous):
+    # То же, что обработка клавиш в Game: прыжок и удар - по нажатию.
+    # Возвращает True, если в этом тике нажат удар
+    if bits & INPUT_LEFT:
+        player.move_left()
+    if bits & INPUT_RIGHT:
+        player.move_right()
+    if not bits & (INPUT_LEFT | INPUT_RIGHT):
+        player.stop()
+    if bits & INPUT_JUMP and not previous & INPUT_JUMP:
+        player.jump()
+    return bool(bits & INPUT_ATTACK and not previous & INPUT_ATTACK)
+
+
+def packet(kind, body=b""):
+    return PACKET_HEADER.pack(NET_MAGIC, kind) + body
+
+
+def encode_state(game, roster):
+    # roster - пары (номер, игрок); возвращает байты квантованного снимка
+    boss = game.boss
+    wave = game.enemy_wave
+    pool = game.projectiles
+    world = np.zeros(1, WORLD_DTYPE)
+    world["state"] = game.state.value
+    world["boss_alive"] = boss.alive()
+    world["boss_health"] = max(0, boss.health)
+    world["boss_x"] = boss.rect.x
+    world["boss_y"] = boss.rect.y
+    world["players"] = len(roster)
+    world["enemies"] = len(wave)
+    world["projectiles"] = len(pool)
+
+    players = np.zeros(len(roster), PLAYER_DTYPE)
+    for record, (player_id, player) in zip(players, roster):
+        record["id"] = player_id
+        record["flags"] = (FLAG_FACING_RIGHT * player.facing_right | FLAG_JUMPING * player.jumping
+                           | FLAG_ATTACKING * player.attacking)
+        record["health"] = max(0, player.health)
+        record["attack_cooldown"] = player.attack_cooldown
+        record["invulnerable"] = max(0, player.invulnerable)
+        record["x"] = player.rect.x
+        record["y"] = player.rect.y
+        record["vx"] = player.velocity_x
+        record["vy"] = round(player.velocity_y * VELOCITY_SCALE)
+
+    n = wave.count
+    enemies = np.zeros(n, ENEMY_DTYPE)
+    enemies["x"] = wave.x[:n]
+    enemies["y"] = wave.y[:n]
+    enemies["direction"] = wave.direction[:n]
+
+    n = pool.count
+    projectiles = np.zeros(n, PROJECTILE_DTYPE)
+    projectiles["x"] = np.round(pool.pos[:n, 0] * POSITION_SCALE)
+    projectiles["y"] = np.round(pool.pos[:n, 1] * POSITION_SCALE)
+    projectiles["vx"] = np.round(pool.vel[:n, 0] * VELOCITY_SCALE)
+    projectiles["vy"] = np.round(pool.vel[:n, 1] * VELOCITY_SCALE)
+    return b"".join((world.tobytes(), players.tobytes(), enemies.tobytes(), projectiles.tobytes()))
+
+
+def decode_state(raw):
+    world = np.frombuffer(raw, WORLD_DTYPE, 1)[0]
+    offset = WORLD_DTYPE.itemsize
+    parts = [world]
+    for dtype, count in ((PLAYER_DTYPE, int(world["players"])), (ENEMY_DTYPE, int(world["enemies"])),
+                         (PROJECTILE_DTYPE, int(world["projectiles"]))):
+        parts.append(np.frombuffer(raw, dtype, count, offset))
+        offset += dtype.itemsize * count
+    return parts
+
+
+def read_player(player, record):
+    flags = int(record["flags"])
+    player.facing_right = bool(flags & FLAG_FACING_RIGHT)
+    player.jumping = bool(flags & FLAG_JUMPING)
+    player.attacking = bool(flags & FLAG_ATTACKING)
+    player.health = int(record["health"])
+    player.attack_cooldown = int(record["attack_cooldown"])
+    player.invulnerable = int(record["invulnerable"])
+    player.rect.x = int(record["x"])
+    player.rect.y = int(record["y"])
+    player.velocity_x = int(record["vx"])
+    player.velocity_y = int(record["vy"]) / VELOCITY_SCALE
+    alpha = player.blink_alpha if player.invulnerable > 0 and player.invulnerable % 10 < 5 else 255
+    player.image = player.variants.get(player.animation_frame, player.facing_right, alpha)
+    if player.facing_right:
+        player.attack_rect.midleft = player.rect.midright
+    else:
+        player.attack_rect.midright = player.rect.midleft
+
+
+def delta_encode(raw, base):
+    # Дельта - XOR с базовым снимком, который клиент уже подтвердил: всё,
+    # что не изменилось, становится нулями и почти бесплатно сжимается zlib
+    if base is not None:
+        data = np.frombuffer(raw, np.uint8).copy()
+        n = min(len(base), len(data))
+        data[:n] ^= np.frombuffer(base, np.uint8, n)
+        raw = data.tobytes()
+    return zlib.compress(raw, 6)
+
+
+def delta_decode(payload, base):
+    data = zlib.decompress(payload)
+    if base is None:
+        return data
+    data = np.frombuffer(data, np.uint8).copy()
+    n = min(len(base), len(data))
+    data[:n] ^= np.frombuffer(base, np.uint8, n)
+    return data.tobytes()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class ClientSlot:
+    def __init__(self, address, player_id, player):
+        self.address = address
+        self.player_id = player_id
+        self.player = player
+        self.inputs = {}
+        self.last_seq = 0
+        self.bits = 0
+        self.acked_tick = NO_BASE
+        self.last_heard = time.perf_counter()
+
+
+class CoopServer:
+    # Авторитетный сервер: сам гоняет update_playing для всех игроков,
+    # клиенты присылают только ввод. Тик - как у одиночной игры (TICK_RATE).
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, max_players=MAX_PLAYERS, level_path=None,
+                 snapshot_interval=SNAPSHOT_INTERVAL):
+        self.game = Game(headless=True, level_path=level_path, audio=False)
+        self.max_players = max_players
+        self.snapshot_interval = snapshot_interval
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()
+        self.clients = {}
+        self.tick = 0
+        self.history = {}
+        self.game_over_ticks = 0
+        self.counts = {"bytes_in": 0, "bytes_out": 0, "packets_in": 0, "packets_out": 0,
+                       "full": 0, "full_bytes": 0, "delta": 0, "delta_bytes": 0, "raw_bytes": 0}
+        self.tick_ms = deque(maxlen=TICK_RATE * 30)
+        self.started = time.perf_counter()
+        self.reset_world()
+
+    def reset_world(self):
+        game = self.game
+        game.init_game()
+        game.state = GameState.PLAYING
+        # Игроков создают подключения; стартовый игрок Game не участвует
+        game.player.kill()
+        game.players.clear()
+        self.game_over_ticks = 0
+        for slot in sorted(self.clients.values(), key=lambda slot: slot.player_id):
+            slot.player = self.spawn_player(slot.player_id)
+
+    def spawn_player(self, player_id):
+        game = self.game
+        x, y = game.spawn_point()
+        x += (player_id - (self.max_players - 1) / 2) * 80
+        player = game.add_player(int(x), y)
+        if game.player not in game.players:
+            # Камера и подгрузка чанков уровня идут за первым подключившимся
+            game.player = player
+        return player
+
+    def send(self, data, address):
+        self.sock.sendto(data, address)
+        self.counts["bytes_out"] += len(data)
+        self.counts["packets_out"] += 1
+
+    def poll(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(MAX_PACKET)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                # Windows сообщает так о недоставленном пакете прошлому клиенту
+                continue
+            self.counts["bytes_in"] += len(data)
+            self.counts["packets_in"] += 1
+            if len(data) < PACKET_HEADER.size:
+                continue
+            magic, kind = PACKET_HEADER.unpack_from(data)
+            if magic != NET_MAGIC:
+                continue
+            slot = self.clients.get(address)
+            if slot is not None:
+                slot.last_heard = time.perf_counter()
+            if kind == MSG_JOIN:
+                self.join(address)
+            elif kind == MSG_INPUT and slot is not None:
+                self.read_input(slot, data)
+            elif kind == MSG_LEAVE and slot is not None:
+                self.leave(slot)
+
+    def join(self, address):
+        slot = self.clients.get(address)
+        if slot is None:
+            taken = {slot.player_id for slot in self.clients.values()}
+            free = [player_id for player_id in range(self.max_players) if player_id not in taken]
+            if not free:
+                self.send(packet(MSG_FULL), address)
+                return
+            slot = ClientSlot(address, free[0], self.spawn_player(free[0]))
+            self.clients[address] = slot
+        self.send(packet(MSG_WELCOME, WELCOME.pack(slot.player_id, self.tick)), address)
+
+    def leave(self, slot):
+        game = self.game
+        del self.clients[slot.address]
+        slot.player.kill()
+        if slot.player in game.players:
+            game.players.remove(slot.player)
+        if game.player is slot.player and game.players:
+            game.player = game.players[0]
+
+    def read_input(self, slot, data):
+        ack_tick, count = INPUT_HEADER.unpack_from(data, PACKET_HEADER.size)
+        if ack_tick in self.history and (slot.acked_tick == NO_BASE or ack_tick > slot.acked_tick):
+            slot.acked_tick = ack_tick
+        offset = PACKET_HEADER.size + INPUT_HEADER.size
+        for _ in range(min(count, (len(data) - offset) // INPUT_ENTRY.size)):
+            seq, bits = INPUT_ENTRY.unpack_from(data, offset)
+            offset += INPUT_ENTRY.size
+            if seq > slot.last_seq:
+                slot.inputs[seq] = bits
+        while len(slot.inputs) > MAX_INPUT_BACKLOG:
+            del slot.inputs[min(slot.inputs)]
+
+    def next_input(self, slot):
+        # Один ввод на тик. Если очередной не дошёл, повторяется прошлый,
+        # а пропуск в номерах (потерянные пакеты) просто перескакивается
+        if not slot.inputs:
+            return slot.bits
+        seq = min(slot.inputs)
+        slot.last_seq = seq
+        return slot.inputs.pop(seq)
+
+    def step(self):
+        start = time.perf_counter()
+        self.poll()
+        now = time.perf_counter()
+        for slot in [slot for slot in self.clients.values() if now - slot.last_heard > CLIENT_TIMEOUT]:
+            self.leave(slot)
+        if not self.clients:
+            return
+        game = self.game
+        if game.state == GameState.GAME_OVER:
+            self.game_over_ticks += 1
+            if self.game_over_ticks >= RESTART_TICKS:
+                self.reset_world()
+        else:
+            for slot in self.clients.values():
+                bits = self.next_input(slot)
+                if slot.player.alive() and apply_input(slot.player, bits, slot.bits):
+                    game.player_attack(slot.player)
+                slot.bits = bits
+            game.update_playing()
+            game.frame_count += 1
+        self.tick += 1
+        if self.tick % self.snapshot_interval == 0:
+            self.send_snapshots()
+        self.tick_ms.append((time.perf_counter() - start) * 1000.0)
+
+    def send_snapshots(self):
+        roster = sorted((slot.player_id, slot.player) for slot in self.clients.values())
+        raw = encode_state(self.game, roster)
+        self.history[self.tick] = raw
+        for tick in [tick for tick in self.history if tick <= self.tick - HISTORY_TICKS]:
+            del self.history[tick]
+        counts = self.counts
+        for slot in self.clients.values():
+            base = self.history.get(slot.acked_tick)
+            base_tick = slot.acked_tick if base is not None else NO_BASE
+            payload = delta_encode(raw, base)
+            self.send(packet(MSG_SNAPSHOT, SNAPSHOT_HEADER.pack(self.tick, base_tick, slot.last_seq, len(raw)) + payload),
+                      slot.address)
+            kind = "full" if base is None else "delta"
+            counts[kind] += 1
+            counts[kind + "_bytes"] += len(payload)
+            counts["raw_bytes"] += len(raw)
+
+    def run(self, seconds=None, conn=None):
+        # conn - конец Pipe: любое сообщение в нём останавливает сервер
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        next_tick = time.perf_counter()
+        while deadline is None or time.perf_counter() < deadline:
+            if conn is not None and conn.poll():
+                break
+            self.step()
+            next_tick += TICK_SECONDS
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -TICK_SECONDS * 5:
+                # Отстали слишком сильно - не догоняем пачкой тиков
+                next_tick = time.perf_counter()
+
+    def metrics(self):
+        counts = self.counts
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        snapshots = counts["full"] + counts["delta"]
+        return {
+            "ticks": self.tick,
+            "clients": len(self.clients),
+            "tick_ms_avg": sum(self.tick_ms) / len(self.tick_ms) if self.tick_ms else 0.0,
+            "tick_ms_p95": percentile(self.tick_ms, 0.95),
+            "tick_ms_max": max(self.tick_ms, default=0.0),
+            "bytes_out_per_s": counts["bytes_out"] / elapsed,
+            "bytes_in_per_s": counts["bytes_in"] / elapsed,
+            "snapshots_full": counts["full"],
+            "snapshots_delta": counts["delta"],
+            "full_bytes_avg": counts["full_bytes"] / counts["full"] if counts["full"] else 0.0,
+            "delta_bytes_avg": counts["delta_bytes"] / counts["delta"] if counts["delta"] else 0.0,
+            "raw_bytes_avg": counts["raw_bytes"] / snapshots if snapshots else 0.0,
+        }
+
+    def close(self):
+        self.sock.close()
+
+
+class CoopClient:
+    # Клиент показывает мир по снимкам сервера, а своего игрока двигает
+    # сразу (предсказание). Пришедший снимок ставит игрока туда, где его
+    # видит сервер, и заново проигрывает вводы, которые сервер ещё не применил.
+    def __init__(self, server_address, game=None, headless=False, level_path=None):
+        if game is None:
+            game = Game(headless=headless, level_path=level_path, audio=not headless)
+        self.game = game
+        game.ensure_world()
+        game.state = GameState.PLAYING
+        self.server = server_address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.player_id = None
+        self.seq = 0
+        self.bits = 0
+        self.pending = deque(maxlen=TICK_RATE * 2)
+        self.predicted = {}
+        self.snapshots = {}
+        self.latest_tick = NO_BASE
+        self.remote = {}
+        self.counts = {"bytes_in": 0, "bytes_out": 0, "snapshots": 0, "dropped": 0, "corrections": 0}
+        self.errors = deque(maxlen=TICK_RATE * 30)
+        self.started = time.perf_counter()
+
+    def send(self, data):
+        self.sock.sendto(data, self.server)
+        self.counts["bytes_out"] += len(data)
+
+    def connect(self, timeout=3.0):
+        deadline = time.perf_counter() + timeout
+        while self.player_id is None:
+            if time.perf_counter() > deadline:
+                raise ConnectionError(f"no answer from {self.server[0]}:{self.server[1]}")
+            self.send(packet(MSG_JOIN))
+            retry = time.perf_counter() + 0.2
+            while self.player_id is None and time.perf_counter() < retry:
+                self.receive()
+                time.sleep(0.005)
+        return self.player_id
+
+    def receive(self):
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(MAX_PACKET)
+            except (BlockingIOError, InterruptedError, ConnectionResetError):
+                return
+            self.counts["bytes_in"] += len(data)
+            if len(data) < PACKET_HEADER.size:
+                continue
+            magic, kind = PACKET_HEADER.unpack_from(data)
+            if magic != NET_MAGIC:
+                continue
+            if kind == MSG_WELCOME:
+                self.player_id, _ = WELCOME.unpack_from(data, PACKET_HEADER.size)
+            elif kind == MSG_FULL:
+                raise ConnectionError("server is full")
+            elif kind == MSG_SNAPSHOT and self.player_id is not None:
+                self.read_snapshot(data)
+
+    def read_snapshot(self, data):
+        tick, base_tick, input_ack, _ = SNAPSHOT_HEADER.unpack_from(data, PACKET_HEADER.size)
+        if self.latest_tick != NO_BASE and tick <= self.latest_tick:
+            # Запоздавший снимок: уже есть новее
+            self.counts["dropped"] += 1
+            return
+        base = None
+        if base_tick != NO_BASE:
+            base = self.snapshots.get(base_tick)
+            if base is None:
+                self.counts["dropped"] += 1
+                return
+        raw = delta_decode(data[PACKET_HEADER.size + SNAPSHOT_HEADER.size:], base)
+        self.snapshots[tick] = raw
+        for old in [old for old in self.snapshots if old <= tick - HISTORY_TICKS]:
+            del self.snapshots[old]
+        self.latest_tick = tick
+        self.counts["snapshots"] += 1
+        self.apply(raw, input_ack)
+
+    def apply(self, raw, input_ack):
+        game = self.game
+        world, players, enemies, projectiles = decode_state(raw)
+        game.state = GameState(int(world["state"]))
+
+        boss = game.boss
+        boss_health = boss.health
+        boss.rect.x = int(world["boss_x"])
+        boss.rect.y = int(world["boss_y"])
+        boss.health = int(world["boss_health"])
+        if world["boss_alive"] and not boss.alive():
+            game.all_sprites.add(boss)
+            game.moving_sprites.add(boss)
+            game.enemies.add(boss)
+        elif not world["boss_alive"]:
+            boss.kill()
+        if boss.health < boss_health:
+            game.particles.emit("boss_hit", boss.rect.centerx, boss.rect.centery)
+            game.sound.play("death" if not boss.is_alive() else "boss_hurt")
+
+        seen = set()
+        own = None
+        for record in players:
+            player_id = int(record["id"])
+            if player_id == self.player_id:
+                own = record
+                continue
+            seen.add(player_id)
+            player = self.remote.get(player_id)
+            if player is None:
+                player = self.remote[player_id] = game.add_player(0, 0)
+            read_player(player, record)
+            if player.is_alive() and not player.alive():
+                game.all_sprites.add(player)
+                game.moving_sprites.add(player)
+            elif not player.is_alive():
+                player.kill()
+        for player_id in [player_id for player_id in self.remote if player_id not in seen]:
+            player = self.remote.pop(player_id)
+            player.kill()
+            game.players.remove(player)
+
+        wave = game.enemy_wave
+        n = len(enemies)
+        wave.reserve(n)
+        wave.x[:n] = enemies["x"]
+        wave.last_x[:n] = enemies["x"]
+        wave.y[:n] = enemies["y"]
+        wave.direction[:n] = enemies["direction"]
+        wave.count = n
+
+        pool = game.projectiles
+        n = len(projectiles)
+        pool.reserve(n)
+        pool.pos[:n, 0] = projectiles["x"] / POSITION_SCALE
+        pool.pos[:n, 1] = projectiles["y"] / POSITION_SCALE
+        pool.vel[:n, 0] = projectiles["vx"] / VELOCITY_SCALE
+        pool.vel[:n, 1] = projectiles["vy"] / VELOCITY_SCALE
+        pool.count = n
+
+        if own is not None:
+            self.reconcile(own, input_ack)
+
+    def reconcile(self, record, input_ack):
+        game = self.game
+        player = game.player
+        health = player.health
+        read_player(player, record)
+        if player.health < health:
+            game.particles.emit("player_hit", player.rect.centerx, player.rect.centery)
+            game.sound.play("player_hurt")
+        if not player.is_alive():
+            player.kill()
+            self.pending.clear()
+            return
+        if not player.alive():
+            # Сервер начал новый бой: игрок снова в мире
+            game.all_sprites.add(player)
+            game.moving_sprites.add(player)
+        # Ошибка предсказания: где клиент считал себя после input_ack и где он на сервере
+        predicted = self.predicted.get(input_ack)
+        if predicted is not None:
+            error = abs(predicted[0] - player.rect.x) + abs(predicted[1] - player.rect.y)
+            self.errors.append(error)
+            if error:
+                self.counts["corrections"] += 1
+        for seq in [seq for seq in self.predicted if seq <= input_ack]:
+            del self.predicted[seq]
+        while self.pending and self.pending[0][0] <= input_ack:
+            self.pending.popleft()
+        for seq, bits, previous in self.pending:
+            self.predict(bits, previous, replay=True)
+            self.predicted[seq] = player.rect.topleft
+
+    def predict(self, bits, previous, replay=False):
+        # Тот же шаг, что делает сервер для одного игрока в update_playing
+        game = self.game
+        player = game.player
+        if not player.alive():
+            return
+        if apply_input(player, bits, previous) and player.attack() and not replay:
+            game.sound.play("attack")
+        start = player.rect.topleft
+        player.update()
+        if game.swept_collisions:
+            on_ground = game.sweep_player(player, start)
+        else:
+            on_ground = game.collide_player(player)
+        if not on_ground and not player.jumping and player.velocity_y == 0:
+            player.velocity_y += player.gravity
+
+    def step(self, bits):
+        # Один тик клиента: отправить ввод, сразу применить его к своему игроку, принять снимки
+        self.seq += 1
+        previous, self.bits = self.bits, bits
+        self.pending.append((self.seq, bits, previous))
+        entries = list(self.pending)[-INPUT_REDUNDANCY:]
+        self.send(packet(MSG_INPUT, INPUT_HEADER.pack(self.latest_tick, len(entries))
+                         + b"".join(INPUT_ENTRY.pack(seq, entry_bits) for seq, entry_bits, _ in entries)))
+        self.predict(bits, previous)
+        self.predicted[self.seq] = self.game.player.rect.topleft
+        self.predicted.pop(self.seq - self.pending.maxlen, None)
+        self.receive()
+        self.game.particles.update()
+
+    def draw(self):
+        game = self.game
+        game.draw_playing()
+        if game.state == GameState.GAME_OVER:
+            game.draw_game_over()
+        game.present()
+
+    def run(self):
+        game = self.game
+        while game.running:
+            game.input.advance()
+            for event in game.input.get_events():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    game.running = False
+            self.step(input_bits(game.input.get_pressed()))
+            self.draw()
+            game.clock.tick(TICK_RATE)
+
+    def metrics(self):
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        return {
+            "player": self.player_id,
+            "snapshots": self.counts["snapshots"],
+            "snapshots_dropped": self.counts["dropped"],
+            "bytes_in_per_s": self.counts["bytes_in"] / elapsed,
+            "bytes_out_per_s": self.counts["bytes_out"] / elapsed,
+            "corrections": self.counts["corrections"],
+            "prediction_error_avg": sum(self.errors) / len(self.errors) if self.errors else 0.0,
+            "prediction_error_max": max(self.errors, default=0),
+        }
+
+    def close(self):
+        try:
+            self.send(packet(MSG_LEAVE))
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def bot_bits(rng, bits):
+    # Случайный «игрок» для проверки: держит направление по нескольку тиков, иногда прыгает и бьёт
+    if rng.random() < 0.05:
+        bits = rng.choice((0, INPUT_LEFT, INPUT_RIGHT))
+    bits &= INPUT_LEFT | INPUT_RIGHT
+    if rng.random() < 0.04:
+        bits |= INPUT_JUMP
+    if rng.random() < 0.08:
+        bits |= INPUT_ATTACK
+    return bits
+
+
+def serve(conn, host, port, max_players, level_path):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    server = CoopServer(host, port, max_players, level_path)
+    conn.send(server.address)
+    server.run(conn=conn)
+    conn.send(server.metrics())
+    server.close()
+
+
+def format_metrics(name, metrics):
+    return f"{name}: " + ", ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                                   for key, value in metrics.items())
+
+
+def run_loopback(clients=3, seconds=5.0, level_path=None, seed=0):
+    # Сервер в отдельном процессе, клиенты-боты без окна в этом; всё по 127.0.0.1
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    ctx = mp.get_context("spawn")
+    conn, child = ctx.Pipe()
+    process = ctx.Process(target=serve, args=(child, "127.0.0.1", 0, max(clients, 1), level_path), daemon=True)
+    process.start()
+    address = conn.recv()
+    rng = random.Random(seed)
+    bots = [CoopClient(address, headless=True, level_path=level_path) for _ in range(clients)]
+    try:
+        for bot in bots:
+            bot.connect()
+        bits = [0] * clients
+        next_tick = time.perf_counter()
+        deadline = next_tick + seconds
+        while time.perf_counter() < deadline:
+            for i, bot in enumerate(bots):
+                bits[i] = bot_bits(rng, bits[i])
+                bot.step(bits[i])
+            next_tick += TICK_SECONDS
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+        client_metrics = [bot.metrics() for bot in bots]
+    finally:
+        for bot in bots:
+            bot.close()
+        conn.send("stop")
+    server_metrics = conn.recv()
+    process.join(timeout=5)
+    return server_metrics, client_metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сетевой кооператив: авторитетный сервер и клиенты по UDP")
+    commands = parser.add_subparsers(dest="command", required=True)
+    server = commands.add_parser("server")
+    server.add_argument("--host", default="0.0.0.0")
+    server.add_argument("--port", type=int, default=DEFAULT_PORT)
+    server.add_argument("--players", type=int, default=MAX_PLAYERS)
+    server.add_argument("--level", help="файл уровня .hklv")
+    server.add_argument("--report-every", type=float, default=5.0, help="секунд между строками метрик")
+    client = commands.add_parser("client")
+    client.add_argument("--host", default="127.0.0.1")
+    client.add_argument("--port", type=int, default=DEFAULT_PORT)
+    client.add_argument("--level", help="файл уровня .hklv (тот же, что у сервера)")
+    loopback = commands.add_parser("loopback", help="сервер и боты на 127.0.0.1, печать метрик")
+    loopback.add_argument("--clients", type=int, default=3)
+    loopback.add_argument("--seconds", type=float, default=5.0)
+    loopback.add_argument("--level")
+    args = parser.parse_args(argv)
+
+    if args.command == "server":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        coop = CoopServer(args.host, args.port, args.players, args.level)
+        print(f"Listening on {coop.address[0]}:{coop.address[1]}")
+        try:
+            while True:
+                coop.run(args.report_every)
+                print(format_metrics("server", coop.metrics()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            coop.close()
+    elif args.command == "client":
+        coop = CoopClient((args.host, args.port), level_path=args.level)
+        print(f"Joined as player {coop.connect()}")
+        try:
+            coop.run()
+        finally:
+            coop.close()
+            print(format_metrics("client", coop.metrics()))
+    else:
+        server_metrics, client_metrics = run_loopback(args.clients, args.seconds, args.level)
+        print(format_metrics("server", server_metrics))
+        for metrics in client_metrics:
+            print(format_metrics("client", metrics))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import math
+
+import numpy as np
+import pygame
+
+from render_target import scaled_surface
+
+# Число заранее отрисованных ступеней затухания на каждый пресет
+FADE_STEPS = 8
+
+# Пресеты эмиттеров: скорость и время жизни - диапазоны (мин, макс),
+# angle/spread - направление и ширина веера в радианах
+PARTICLE_PRESETS = {
+    "boss_hit": dict(count=40, speed=(2.0, 7.0), life=(20, 40), gravity=0.15, drag=0.94,
+                     color=(255, 190, 80), radius=6, angle=0.0, spread=2 * math.pi),
+    "player_hit": dict(count=24, speed=(1.5, 5.0), life=(15, 30), gravity=0.1, drag=0.92,
+                       color=(255, 60, 50), radius=5, angle=0.0, spread=2 * math.pi),
+    "landing": dict(count=14, speed=(0.5, 2.5), life=(12, 24), gravity=0.05, drag=0.9,
+                    color=(150, 150, 175), radius=4, angle=-math.pi / 2, spread=math.pi * 0.9),
+}
+
+
+def render_glow(color, radius, intensity):
+    # Круглое пятно, яркое в центре. Фон чёрный: при BLEND_ADD он ничего не добавляет
+    size = radius * 2 + 1
+    surface = pygame.Surface((size, size)).convert()
+    surface.fill((0, 0, 0))
+    for r in range(radius, 0, -1):
+        k = intensity * (1.0 - (r - 1) / radius)
+        pygame.draw.circle(surface, [int(c * k) for c in color], (radius, radius), r)
+    return surface
+
+
+class ParticleSystem:
+    # Частицы в массивах фиксированной ёмкости: новые частицы не создают
+    # объектов, а при заполнении пула лишние просто не появляются.
+    # Спрайты всех ступеней затухания рисуются один раз при добавлении
+    # пресета и выводятся одним blits() с аддитивным смешиванием.
+    def __init__(self, capacity=8192, presets=PARTICLE_PRESETS, seed=None):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.life = np.ones(capacity, dtype=np.float32)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        self.drag = np.ones(capacity, dtype=np.float32)
+        self.style = np.zeros(capacity, dtype=np.int32)
+        self.count = 0
+        self.dropped = 0
+        # Свой генератор, чтобы эффекты не сдвигали random игры
+        self.rng = np.random.default_rng(seed)
+        self.presets = {}
+        self.sprites = []
+        self.half_sizes = []
+        self.half = np.zeros(0, dtype=np.float32)
+        for name, params in presets.items():
+            self.add_preset(name, **params)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def add_preset(self, name, count, speed, life, gravity, drag, color, radius, angle=0.0, spread=2 * math.pi):
+        style = len(self.presets)
+        self.presets[name] = (style, count, speed, life, gravity, drag, angle, spread)
+        for step in range(FADE_STEPS):
+            self.sprites.append(render_glow(color, radius, 1.0 - step / FADE_STEPS))
+        self.half_sizes.append(radius)
+        self.half = np.array(self.half_sizes, dtype=np.float32)
+
+    def emit(self, name, x, y, angle=None, count=None):
+        style, preset_count, speed, life, gravity, drag, preset_angle, spread = self.presets[name]
+        wanted = preset_count if count is None else count
+        n = min(wanted, self.capacity - self.count)
+        self.dropped += wanted - n
+        if n <= 0:
+            return 0
+        if angle is None:
+            angle = preset_angle
+        rng = self.rng
+        s = slice(self.count, self.count + n)
+        theta = angle + (rng.random(n, dtype=np.float32) - 0.5) * spread
+        magnitude = speed[0] + rng.random(n, dtype=np.float32) * (speed[1] - speed[0])
+        self.pos[s] = (x, y)
+        self.vel[s, 0] = np.cos(theta) * magnitude
+        self.vel[s, 1] = np.sin(theta) * magnitude
+        self.age[s] = 0
+        self.life[s] = rng.integers(life[0], life[1], n, endpoint=True)
+        self.gravity[s] = gravity
+        self.drag[s] = drag
+        self.style[s] = style
+        self.count += n
+        return n
+
+    def keep(self, mask):
+        keep = np.flatnonzero(mask)
+        k = len(keep)
+        if k != self.count:
+            for array in (self.pos, self.vel, self.age, self.life, self.gravity, self.drag, self.style):
+                array[:k] = array[keep]
+            self.count = k
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        vel = self.vel[:n]
+        vel[:, 1] += self.gravity[:n]
+        vel *= self.drag[:n, None]
+        self.pos[:n] += vel
+        age = self.age[:n]
+        age += 1
+        alive = age < self.life[:n]
+        if not alive.all():
+            self.keep(alive)
+
+    def visible(self, offset, view):
+        # Индексы спрайтов и левые верхние углы видимых частиц в экранных координатах
+        n = self.count
+        style = self.style[:n]
+        half = self.half[style]
+        x = self.pos[:n, 0] - half
+        y = self.pos[:n, 1] - half
+        if view is not None:
+            size = half * 2 + 1
+            inside = (x < view.right) & (x + size > view.left) & (y < view.bottom) & (y + size > view.top)
+            style = style[inside]
+            x = x[inside]
+            y = y[inside]
+            frame = (self.age[:n][inside] * FADE_STEPS / self.life[:n][inside]).astype(np.int32)
+        else:
+            frame = (self.age[:n] * FADE_STEPS / self.life[:n]).astype(np.int32)
+        keys = style * FADE_STEPS + np.minimum(frame, FADE_STEPS - 1)
+        return keys, x + offset[0], y + offset[1]
+
+    def draw(self, surface, offset=(0, 0), view=None, scale=1.0):
+        # Возвращает число нарисованных частиц и прямоугольник (в пикселях
+        # холста), который они задели
+        if self.count == 0:
+            return 0, None
+        keys, x, y = self.visible(offset, view)
+        if len(keys) == 0:
+            return 0, None
+        sprites = self.sprites
+        if scale != 1.0:
+            sprites = [scaled_surface(sprite, scale) for sprite in sprites]
+            x = x * scale
+            y = y * scale
+        add = pygame.BLEND_ADD
+        surface.blits([(sprites[k], (px, py), None, add)
+                       for k, px, py in zip(keys.tolist(), x.astype(np.int32).tolist(), y.astype(np.int32).tolist())],
+                      False)
+        extent = int(self.half.max() * scale) * 2 + 2
+        left = int(x.min())
+        top = int(y.min())
+        bounds = pygame.Rect(left, top, int(x.max()) - left + extent, int(y.max()) - top + extent)
+        return len(keys), bounds
+
+    def stats(self):
+        return {"live": self.count, "capacity": self.capacity, "dropped": self.dropped}
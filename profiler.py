@@ -0,0 +1,122 @@
+import json
+import os
+from collections import deque
+from time import perf_counter_ns
+
+import pygame
+
+
+class FrameProfiler:
+    # Замер фаз кадра. Пока профайлер выключен, begin()/end() сразу
+    # возвращаются, так что в обычной игре он почти ничего не стоит.
+    def __init__(self, history=240, max_events=500000, budget_ms=1000.0 / 60):
+        self.enabled = False
+        self.history = deque(maxlen=history)
+        self.max_events = max_events
+        self.budget_ms = budget_ms
+        self.stack = []
+        self.phases = {}
+        self.events = []
+        self.frame_start = 0
+        self.font = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.stack.clear()
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.stack.clear()
+        self.phases = {}
+        self.frame_start = perf_counter_ns()
+
+    def end_frame(self):
+        if not self.enabled or not self.frame_start:
+            return
+        now = perf_counter_ns()
+        self.record("frame", self.frame_start, now)
+        self.history.append(((now - self.frame_start) / 1e6, self.phases))
+        self.frame_start = 0
+
+    def begin(self, name):
+        if not self.enabled:
+            return
+        self.stack.append((name, perf_counter_ns()))
+
+    def end(self):
+        if not self.enabled or not self.stack:
+            return
+        name, start = self.stack.pop()
+        now = perf_counter_ns()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - start) / 1e6
+        self.record(name, start, now)
+
+    def record(self, name, start, end):
+        if len(self.events) < self.max_events:
+            self.events.append((name, start, end - start))
+
+    def averages(self):
+        if not self.history:
+            return 0.0, {}
+        totals = {}
+        frame_total = 0.0
+        for frame_ms, phases in self.history:
+            frame_total += frame_ms
+            for name, ms in phases.items():
+                totals[name] = totals.get(name, 0.0) + ms
+        n = len(self.history)
+        return frame_total / n, {name: ms / n for name, ms in totals.items()}
+
+    def export_chrome_trace(self, path):
+        # Формат Trace Event (chrome://tracing, Perfetto): полные события "X" в микросекундах
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {"name": name, "ph": "X", "ts": start / 1000.0, "dur": duration / 1000.0,
+                 "pid": pid, "tid": 0, "cat": name.split(".")[0]}
+                for name, start, duration in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+        with open(path, "w") as f:
+            json.dump(trace, f)
+        return len(self.events)
+
+    def clear(self):
+        self.history.clear()
+        self.events = []
+
+    def draw_overlay(self, surface, pos=(10, 40), size=(240, 80), extra=()):
+        if not self.enabled:
+            return None
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        x, y = pos
+        width, height = size
+        lines = []
+        frame_ms, phases = self.averages()
+        lines.append(f"frame {frame_ms:6.2f} ms")
+        for name in sorted(phases):
+            lines.append(f"{name:<20} {phases[name]:6.2f}")
+        lines.extend(extra)
+        text_height = len(lines) * 14 + 4
+
+        panel = pygame.Rect(x, y, width, height + text_height)
+        background = pygame.Surface(panel.size, pygame.SRCALPHA)
+        background.fill((0, 0, 0, 170))
+        surface.blit(background, panel)
+
+        # График времени кадра, линия - бюджет кадра
+        scale = height / (self.budget_ms * 2)
+        budget_y = y + height - int(self.budget_ms * scale)
+        pygame.draw.line(surface, (255, 255, 0), (x, budget_y), (x + width, budget_y))
+        bar_width = max(1, width // max(1, self.history.maxlen))
+        for i, (ms, _) in enumerate(self.history):
+            bar_height = min(height, int(ms * scale))
+            color = (0, 220, 0) if ms <= self.budget_ms else (230, 40, 40)
+            pygame.draw.rect(surface, color, (x + i * bar_width, y + height - bar_height, bar_width, bar_height))
+
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, True, (255, 255, 255)), (x + 4, y + height + 2 + i * 14))
+        return panel
@@ -0,0 +1,167 @@
+import math
+
+import numpy as np
+
+from collision import sweep_hits
+from render_target import scaled_surface
+
+
+class ProjectilePool:
+    # Все снаряды хранятся в непрерывных массивах NumPy: позиции центров и
+    # скорости. Живые снаряды всегда занимают первые self.count строк.
+    def __init__(self, image, bounds, speed=5, margin=50, capacity=256):
+        self.image = image
+        self.half_w = image.get_width() // 2
+        self.half_h = image.get_height() // 2
+        self.width = image.get_width()
+        self.height = image.get_height()
+        self.bounds = bounds
+        self.margin = margin
+        self.speed = speed
+        self.pos = np.zeros((capacity, 2), dtype=np.float64)
+        self.vel = np.zeros((capacity, 2), dtype=np.float64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def reserve(self, needed):
+        capacity = len(self.pos)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        pos = np.zeros((capacity, 2), dtype=np.float64)
+        vel = np.zeros((capacity, 2), dtype=np.float64)
+        pos[:self.count] = self.pos[:self.count]
+        vel[:self.count] = self.vel[:self.count]
+        self.pos = pos
+        self.vel = vel
+
+    def spawn(self, x, y, target_x, target_y):
+        dx = target_x - x
+        dy = target_y - y
+        distance = math.sqrt(dx**2 + dy**2)
+        if distance > 0:
+            vx = (dx / distance) * self.speed
+            vy = (dy / distance) * self.speed
+        else:
+            vx = 0
+            vy = 0
+        self.spawn_velocity(x, y, vx, vy)
+
+    def spawn_velocity(self, x, y, vx, vy):
+        self.reserve(self.count + 1)
+        i = self.count
+        self.pos[i] = (x, y)
+        self.vel[i] = (vx, vy)
+        self.count += 1
+
+    def spawn_many(self, positions, velocities):
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+        n = len(positions)
+        self.reserve(self.count + n)
+        self.pos[self.count:self.count + n] = positions
+        self.vel[self.count:self.count + n] = velocities
+        self.count += n
+
+    def keep(self, mask):
+        # Сжатие массивов: живые строки переезжают в начало
+        keep = np.flatnonzero(mask)
+        k = len(keep)
+        if k != self.count:
+            self.pos[:k] = self.pos[keep]
+            self.vel[:k] = self.vel[keep]
+            self.count = k
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        pos = self.pos[:n]
+        pos += self.vel[:n]
+
+        width, height = self.bounds
+        left = pos[:, 0] - self.half_w
+        top = pos[:, 1] - self.half_h
+        inside = ((left >= -self.margin) & (left <= width + self.margin) &
+                  (top >= -self.margin) & (top <= height + self.margin))
+        if not inside.all():
+            self.keep(inside)
+
+    def collide_mask(self, rect):
+        n = self.count
+        pos = self.pos[:n]
+        left = pos[:, 0] - self.half_w
+        top = pos[:, 1] - self.half_h
+        return ((left < rect.right) & (left + self.width > rect.left) &
+                (top < rect.bottom) & (top + self.height > rect.top))
+
+    def collide_rect(self, rect, remove=True):
+        # Возвращает число снарядов, задевших rect, и удаляет их
+        if self.count == 0:
+            return 0
+        hits = self.collide_mask(rect)
+        hit_count = int(np.count_nonzero(hits))
+        if hit_count and remove:
+            self.keep(~hits)
+        return hit_count
+
+    def sweep_rect(self, rect, dx=0, dy=0, remove=True):
+        # Как collide_rect, но по всему пути снаряда за последний update():
+        # быстрый снаряд не проскочит rect насквозь. rect за тот же шаг
+        # сдвинулся на (dx, dy), поэтому берётся движение относительно него.
+        if self.count == 0:
+            return 0
+        n = self.count
+        vel = self.vel[:n]
+        start = self.pos[:n] - vel
+        hits = sweep_hits(start[:, 0] - self.half_w, start[:, 1] - self.half_h, self.width, self.height,
+                          vel[:, 0] - dx, vel[:, 1] - dy, rect.move(-dx, -dy))
+        hit_count = int(np.count_nonzero(hits))
+        if hit_count and remove:
+            self.keep(~hits)
+        return hit_count
+
+    def screen_corners(self, offset=(0, 0), view=None, scale=1.0):
+        # Левые верхние углы в экранных координатах; view отсекает невидимые,
+        # scale переводит в пиксели холста с пониженным разрешением
+        n = self.count
+        corners = self.pos[:n] - (self.half_w - offset[0], self.half_h - offset[1])
+        if view is not None:
+            corners = corners[self.collide_mask(view)]
+        if scale != 1.0:
+            corners = corners * scale
+        return corners.astype(np.int32).tolist()
+
+    def rects(self, offset=(0, 0), view=None):
+        return [(x, y, self.width, self.height) for x, y in self.screen_corners(offset, view)]
+
+    def pack_state(self):
+        n = self.count
+        return (self.pos[:n].tobytes() + self.vel[:n].tobytes() +
+                np.array([self.speed], dtype=np.float64).tobytes())
+
+    def restore_state(self, data, offset, count):
+        self.reserve(count)
+        size = count * 2 * 8
+        self.pos[:count] = np.frombuffer(data, dtype=np.float64, count=count * 2, offset=offset).reshape(-1, 2)
+        offset += size
+        self.vel[:count] = np.frombuffer(data, dtype=np.float64, count=count * 2, offset=offset).reshape(-1, 2)
+        offset += size
+        self.speed = float(np.frombuffer(data, dtype=np.float64, count=1, offset=offset)[0])
+        self.count = count
+        return offset + 8
+
+    def draw(self, surface, offset=(0, 0), view=None, scale=1.0):
+        # Возвращает число нарисованных снарядов
+        if self.count == 0:
+            return 0
+        image = scaled_surface(self.image, scale)
+        corners = self.screen_corners(offset, view, scale)
+        surface.blits([(image, corner) for corner in corners], False)
+        return len(corners)
@@ -0,0 +1,197 @@
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+
+import numpy as np
+import pygame
+
+# Формат записи (.hkrec): заголовок REC_HEADER, затем кадры:
+# длина (uint32) + байты кадра (height x width x RGB, по строкам),
+# при compressed=1 - сжатые zlib
+REC_MAGIC = b"HKREC1"
+REC_HEADER = struct.Struct("<6sIIIB")
+FRAME_LENGTH = struct.Struct("<I")
+
+
+class FrameRecorder:
+    # Захват кадров в кольцевой буфер через surfarray: пиксели копируются
+    # одним memcpy в заранее выделенный слот, без Python-объектов на кадр.
+    # pixels2d(...).T лежит в памяти построчно, как и сама поверхность, а
+    # pixels3d пришлось бы собирать поэлементно - в ~20 раз медленнее.
+    # Перевод в RGB, сжатие и запись на диск идут в фоновом потоке.
+    def __init__(self, size, fps=30, seconds=3, game_fps=60, compress=True):
+        self.width, self.height = size
+        self.fps = fps
+        self.interval = max(1, round(game_fps / fps))
+        self.capacity = max(1, int(fps * seconds))
+        self.compress = compress
+        self.ring = np.empty((self.capacity, self.height, self.width), dtype=np.uint32)
+        self.shifts = None
+        self.captured = 0
+        self.tick = 0
+        self.dropped = 0
+        self.warned = False
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.stream_file = None
+        self.streamed = 0
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def capture(self, surface):
+        self.tick += 1
+        if self.tick % self.interval:
+            return False
+        if surface.get_size() != (self.width, self.height) or surface.get_bytesize() != 4:
+            if not self.warned:
+                width, height = surface.get_size()
+                print(f"Recorder: {width}x{height} frame at {surface.get_bytesize() * 8} bpp does not match "
+                      f"{self.width}x{self.height} at 32 bpp, frames are not captured")
+                self.warned = True
+            return False
+        self.shifts = surface.get_shifts()[:3]
+        with self.lock:
+            slot = self.captured % self.capacity
+            # Писатель не успевает: кадр в этом слоте пропускается до
+            # перезаписи, чтобы drain_stream не прочитал его наполовину новым
+            oldest = self.captured - self.capacity + 1
+            if self.stream_file is not None and self.streamed < oldest:
+                self.dropped += oldest - self.streamed
+                self.streamed = oldest
+        pixels = pygame.surfarray.pixels2d(surface)
+        np.copyto(self.ring[slot], pixels.T)
+        del pixels  # снимает блокировку поверхности
+        with self.lock:
+            self.captured += 1
+            if self.stream_file is not None:
+                self.jobs.put(("stream", None))
+        return True
+
+    def write_header(self, f):
+        f.write(REC_HEADER.pack(REC_MAGIC, self.width, self.height, self.fps, int(self.compress)))
+
+    def encode(self, frame):
+        rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        for channel, shift in enumerate(self.shifts):
+            rgb[:, :, channel] = frame >> shift
+        data = rgb.tobytes()
+        return zlib.compress(data, 1) if self.compress else data
+
+    def write_frame(self, f, frame):
+        data = self.encode(frame)
+        f.write(FRAME_LENGTH.pack(len(data)))
+        f.write(data)
+
+    def save_last(self, path, seconds=None):
+        # Копия последних кадров снимается сразу, запись на диск - в фоне
+        with self.lock:
+            available = min(self.captured, self.capacity)
+            count = available if seconds is None else min(available, int(seconds * self.fps))
+            first = self.captured - count
+            slots = [(first + i) % self.capacity for i in range(count)]
+        frames = self.ring[slots]
+        self.jobs.put(("save", (path, frames)))
+        return count
+
+    def start_stream(self, path):
+        self.jobs.put(("open", path))
+
+    def stop_stream(self):
+        self.jobs.put(("close", None))
+
+    @property
+    def streaming(self):
+        return self.stream_file is not None
+
+    def write_loop(self):
+        while True:
+            job, payload = self.jobs.get()
+            try:
+                if job == "stop":
+                    break
+                self.run_job(job, payload)
+            except OSError as error:
+                print(f"Recorder: {error}")
+            finally:
+                self.jobs.task_done()
+
+    def run_job(self, job, payload):
+        if job == "save":
+            path, frames = payload
+            with open(path, "wb") as f:
+                self.write_header(f)
+                for frame in frames:
+                    self.write_frame(f, frame)
+        elif job == "open":
+            f = open(payload, "wb")
+            self.write_header(f)
+            with self.lock:
+                self.streamed = self.captured
+                self.stream_file = f
+        elif job == "stream":
+            self.drain_stream()
+        elif job == "close":
+            self.drain_stream()
+            with self.lock:
+                f, self.stream_file = self.stream_file, None
+            if f is not None:
+                f.close()
+
+    def drain_stream(self):
+        while True:
+            with self.lock:
+                f = self.stream_file
+                if f is None or self.streamed >= self.captured:
+                    return
+                index = self.streamed
+                frame = self.ring[index % self.capacity].copy()
+                self.streamed += 1
+            self.write_frame(f, frame)
+
+    def flush(self):
+        self.jobs.join()
+
+    def close(self):
+        self.stop_stream()
+        self.jobs.put(("stop", None))
+        self.writer.join()
+
+    def stats(self):
+        return {"captured": self.captured, "dropped": self.dropped,
+                "buffered": min(self.captured, self.capacity), "streaming": self.streaming}
+
+
+def read_frames(path):
+    with open(path, "rb") as f:
+        magic, width, height, fps, compressed = REC_HEADER.unpack(f.read(REC_HEADER.size))
+        if magic != REC_MAGIC:
+            raise ValueError(f"{path}: not a recording")
+        while True:
+            header = f.read(FRAME_LENGTH.size)
+            if len(header) < FRAME_LENGTH.size:
+                return
+            (length,) = FRAME_LENGTH.unpack(header)
+            data = f.read(length)
+            if compressed:
+                data = zlib.decompress(data)
+            yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+
+
+def main(argv):
+    # python recorder.py dump ЗАПИСЬ.hkrec ПАПКА - сохранить кадры в PNG
+    if len(argv) != 3 or argv[0] != "dump":
+        print("usage: python recorder.py dump RECORDING OUTDIR")
+        return 1
+    os.makedirs(argv[2], exist_ok=True)
+    count = 0
+    for count, frame in enumerate(read_frames(argv[1]), 1):
+        pygame.image.save(pygame.surfarray.make_surface(frame.transpose(1, 0, 2)), os.path.join(argv[2], f"frame_{count:05d}.png"))
+    print(f"{count} frames")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,174 @@
+import weakref
+
+import pygame
+
+# Ступени внутреннего разрешения (доля логического размера) для динамического режима
+RENDER_SCALES = (1.0, 0.75, 0.5)
+# Способы вывода холста на экран:
+# native  - окно логического размера;
+# scaled  - окно логического размера с флагом pygame.SCALED, растягивает SDL;
+# integer - окно размера display_size, холст увеличивается в целое число раз
+PRESENT_MODES = ("native", "scaled", "integer")
+
+# Исходная поверхность -> {масштаб: уменьшенная копия}. Ключи слабые: запись
+# исчезает вместе с исходной картинкой (перерисованный текст HUD, выгруженные платформы)
+scaled_surfaces = weakref.WeakKeyDictionary()
+
+
+def scaled_surface(image, scale):
+    # Картинка для холста со внутренним разрешением scale; кэш сбрасывается при смене масштаба
+    if scale == 1.0:
+        return image
+    scales = scaled_surfaces.get(image)
+    if scales is None:
+        scales = scaled_surfaces[image] = {}
+    result = scales.get(scale)
+    if result is None:
+        width, height = image.get_size()
+        result = pygame.transform.scale(image, (max(1, round(width * scale)), max(1, round(height * scale))))
+        scales[scale] = result
+    return result
+
+
+def clear_scaled_surfaces():
+    scaled_surfaces.clear()
+
+
+class RenderTarget:
+    # Холст, в который рисуется кадр, и его вывод на экран. Игра рисует в
+    # логических координатах logical_size, холст имеет размер
+    # logical_size * scale. В динамическом режиме scale понижается, когда
+    # среднее время кадра выходит за бюджет, и возвращается, когда запас есть.
+    def __init__(self, logical_size, mode="native", display_size=None, fullscreen=False,
+                 scale=1.0, dynamic=False, budget_ms=1000.0 / 60, window=30, cooldown=90):
+        if mode not in PRESENT_MODES:
+            raise ValueError(f"unknown present mode: {mode}")
+        self.logical_size = logical_size
+        self.mode = mode
+        self.dynamic = dynamic
+        self.budget_ms = budget_ms
+        self.window = window
+        self.cooldown = cooldown
+        self.samples = []
+        self.frames_since_change = 0
+        self.changed = False
+        self.stats = {}
+
+        flags = pygame.FULLSCREEN if fullscreen else 0
+        if mode == "integer":
+            if display_size is None:
+                display_size = pygame.display.get_desktop_sizes()[0] if fullscreen else logical_size
+            self.display = pygame.display.set_mode(display_size, flags)
+        elif mode == "scaled":
+            try:
+                self.display = pygame.display.set_mode(logical_size, flags | pygame.SCALED)
+            except pygame.error as error:
+                # SCALED требует аппаратный рендерер SDL (его нет, например, в dummy-драйвере)
+                print(f"SCALED unavailable ({error}), using a native window")
+                self.mode = "native"
+                self.display = pygame.display.set_mode(logical_size, flags)
+        else:
+            self.display = pygame.display.set_mode(logical_size, flags)
+        self.canvas = None
+        self.upscaled = None
+        self.logical_copy = None
+        self.set_scale(scale)
+
+    @property
+    def direct(self):
+        # Холст - это сама поверхность окна: можно выводить только изменённые области
+        return self.canvas is self.display
+
+    def set_scale(self, scale):
+        self.scale = scale
+        width, height = self.logical_size
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if self.mode != "integer" and size == self.display.get_size():
+            self.canvas = self.display
+        else:
+            self.canvas = pygame.Surface(size).convert()
+        self.upscaled = None
+        if self.mode == "integer":
+            display_width, display_height = self.display.get_size()
+            factor = max(1, min(display_width // size[0], display_height // size[1]))
+            output = (size[0] * factor, size[1] * factor)
+            if output != size:
+                self.upscaled = pygame.Surface(output).convert()
+            self.output_pos = ((display_width - output[0]) // 2, (display_height - output[1]) // 2)
+            self.display.fill((0, 0, 0))
+        clear_scaled_surfaces()
+        self.samples.clear()
+        self.frames_since_change = 0
+        self.changed = True
+
+    def to_canvas(self, rect):
+        # Логический прямоугольник (HUD, грязные области) в пикселях холста
+        scale = self.scale
+        if scale == 1.0:
+            return rect
+        rect = pygame.Rect(rect)
+        left = int(rect.left * scale)
+        top = int(rect.top * scale)
+        return pygame.Rect(left, top, int(rect.right * scale + 0.999) - left, int(rect.bottom * scale + 0.999) - top)
+
+    def present(self, dirty=None):
+        if self.direct:
+            if dirty is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty)
+            return
+        if self.mode == "integer":
+            frame = self.canvas
+            if self.upscaled is not None:
+                pygame.transform.scale(self.canvas, self.upscaled.get_size(), self.upscaled)
+                frame = self.upscaled
+            self.display.blit(frame, self.output_pos)
+        else:
+            pygame.transform.scale(self.canvas, self.display.get_size(), self.display)
+        pygame.display.flip()
+
+    def logical_frame(self):
+        # Готовый кадр логического размера (для записи): в режимах native и
+        # scaled это само окно, в integer - холст до увеличения
+        if self.mode != "integer" and self.display.get_size() == self.logical_size:
+            return self.display
+        if self.canvas.get_size() == self.logical_size:
+            return self.canvas
+        if self.logical_copy is None:
+            self.logical_copy = pygame.Surface(self.logical_size).convert()
+        pygame.transform.scale(self.canvas, self.logical_size, self.logical_copy)
+        return self.logical_copy
+
+    def record_frame(self, frame_ms):
+        # Возвращает True, если масштаб сменился и холст нужно перерисовать целиком
+        entry = self.stats.setdefault(self.scale, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += frame_ms
+        entry[2] = max(entry[2], frame_ms)
+        if not self.dynamic:
+            return False
+        self.frames_since_change += 1
+        self.samples.append(frame_ms)
+        if len(self.samples) > self.window:
+            self.samples.pop(0)
+        if len(self.samples) < self.window or self.frames_since_change < self.cooldown:
+            return False
+        average = sum(self.samples) / len(self.samples)
+        index = RENDER_SCALES.index(self.scale) if self.scale in RENDER_SCALES else 0
+        if average > self.budget_ms and index + 1 < len(RENDER_SCALES):
+            self.set_scale(RENDER_SCALES[index + 1])
+            return True
+        if average < self.budget_ms * 0.5 and index > 0:
+            self.set_scale(RENDER_SCALES[index - 1])
+            return True
+        return False
+
+    def report(self):
+        lines = []
+        width, height = self.logical_size
+        for scale in sorted(self.stats, reverse=True):
+            frames, total_ms, max_ms = self.stats[scale]
+            lines.append(f"{round(width * scale)}x{round(height * scale)} ({scale:.2f}): "
+                         f"{frames} frames, avg {total_ms / frames:.2f} ms, max {max_ms:.2f} ms")
+        return "\n".join(lines)
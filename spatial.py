@@ -0,0 +1,111 @@
+class SpatialHash:
+    # Равномерная сетка: клетка -> список объектов с атрибутом rect.
+    # Используется как broadphase вместо линейного spritecollide.
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.item_cells = {}
+
+    def __len__(self):
+        return len(self.item_cells)
+
+    def __contains__(self, item):
+        return item in self.item_cells
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        # right/bottom не входят в Rect, поэтому берём последний пиксель
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def insert(self, item, rect=None):
+        rect = item.rect if rect is None else rect
+        x0, y0, x1, y1 = self.cell_range(rect)
+        keys = []
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                key = (cx, cy)
+                bucket = cells.get(key)
+                if bucket is None:
+                    cells[key] = [item]
+                else:
+                    bucket.append(item)
+                keys.append(key)
+        self.item_cells[item] = keys
+
+    def remove(self, item):
+        keys = self.item_cells.pop(item, None)
+        if keys is None:
+            return
+        for key in keys:
+            bucket = self.cells[key]
+            bucket.remove(item)
+            if not bucket:
+                del self.cells[key]
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+
+    def rebuild(self, items):
+        self.clear()
+        for item in items:
+            self.insert(item)
+
+    def candidates(self, rect):
+        x0, y0, x1, y1 = self.cell_range(rect)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            return list(cells.get((x0, y0), ()))
+        seen = set()
+        result = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for item in cells.get((cx, cy), ()):
+                    if item not in seen:
+                        seen.add(item)
+                        result.append(item)
+        return result
+
+    def query(self, rect):
+        # Точная проверка пересечения после отбора по клеткам
+        return [item for item in self.candidates(rect) if rect.colliderect(item.rect)]
+
+    def query_sprites(self, rect):
+        # То же, но пропускает спрайты, убитые после последней перестройки
+        return [item for item in self.candidates(rect)
+                if item.alive() and rect.colliderect(item.rect)]
+
+
+class DynamicIndex:
+    # Индекс для объектов, которые двигаются каждый кадр. Перестраивать
+    # хэш-сетку на каждом кадре в Python дороже, чем один проход
+    # Rect.collidelistall на C, поэтому здесь хранится только снимок
+    # списка спрайтов и их rect'ов.
+    def __init__(self):
+        self.items = []
+        self.rects = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def insert(self, item):
+        self.items.append(item)
+        self.rects.append(item.rect)
+
+    def clear(self):
+        self.items = []
+        self.rects = []
+
+    def rebuild(self, items):
+        self.items = list(items)
+        self.rects = [item.rect for item in self.items]
+
+    def query(self, rect):
+        items = self.items
+        return [items[i] for i in rect.collidelistall(self.rects)]
+
+    def query_sprites(self, rect):
+        items = self.items
+        return [items[i] for i in rect.collidelistall(self.rects) if items[i].alive()]
@@ -0,0 +1,127 @@
+import numpy as np
+import pygame
+
+from collision import ALL_FACES, BOTTOM, LEFT, RIGHT, TOP, move_and_slide, sweep_aabb, sweep_hits
+
+ONE_WAY = frozenset((TOP, LEFT, RIGHT))
+
+
+def test_resting_contact_blocks_further_fall():
+    platform = pygame.Rect(0, 100, 200, 20)
+    body = pygame.Rect(50, 40, 40, 60)
+    assert sweep_aabb(body, 0, 5, platform) == (0.0, TOP)
+
+    contacts = move_and_slide(body, 0, 5, [platform])
+    assert body.bottom == platform.top
+    assert contacts == [(TOP, platform)]
+
+
+def test_touching_contact_does_not_catch_sliding_or_leaving():
+    platform = pygame.Rect(0, 100, 200, 20)
+    body = pygame.Rect(50, 40, 40, 60)
+    # Скольжение вдоль грани и отрыв от неё - не столкновения
+    assert sweep_aabb(body, 10, 0, platform) is None
+    assert sweep_aabb(body, 0, -5, platform) is None
+    # Касание боком у самого края платформы
+    wall = pygame.Rect(90, 0, 20, 100)
+    assert sweep_aabb(body, 0, 30, wall) is None
+
+
+def test_side_contact_stops_horizontal_motion():
+    wall = pygame.Rect(100, 0, 20, 200)
+    body = pygame.Rect(60, 50, 40, 60)
+    assert sweep_aabb(body, 7, 0, wall) == (0.0, LEFT)
+    move_and_slide(body, 7, 3, [wall])
+    assert body.right == wall.left
+    assert body.y == 53
+
+
+def test_corner_hit_resolves_without_overlap():
+    block = pygame.Rect(100, 100, 50, 50)
+    body = pygame.Rect(60, 60, 40, 40)
+    # Угол в угол: выход по обеим осям в один момент, выбирается вертикальная грань
+    t, normal = sweep_aabb(body, 20, 20, block)
+    assert t == 0.0 and normal == TOP
+    move_and_slide(body, 20, 20, [block])
+    assert not body.colliderect(block)
+    assert body.bottom == block.top and body.x == 80
+
+
+def test_corner_graze_misses():
+    block = pygame.Rect(100, 100, 50, 50)
+    body = pygame.Rect(50, 50, 40, 40)
+    # Проходит мимо угла по диагонали, не задевая
+    assert sweep_aabb(body, 10, -30, block) is None
+
+
+def test_one_way_platform_passes_from_below_and_holds_from_above():
+    platform = pygame.Rect(0, 100, 200, 20)
+    body = pygame.Rect(50, 130, 40, 60)
+    assert sweep_aabb(body, 0, -130, platform)[1] == BOTTOM
+
+    contacts = move_and_slide(body, 0, -130, [platform], ONE_WAY)
+    assert contacts == []
+    assert body.y == 0
+
+    contacts = move_and_slide(body, 0, 60, [platform], ONE_WAY)
+    assert contacts == [(TOP, platform)]
+    assert body.bottom == platform.top
+
+
+def test_body_inside_one_way_platform_is_not_snapped():
+    # Прыжок снизу не успел вынести тело из платформы: вниз оно падает сквозь неё
+    platform = pygame.Rect(0, 100, 200, 20)
+    body = pygame.Rect(50, 50, 40, 60)
+    assert sweep_aabb(body, 0, 10, platform) is None
+    assert move_and_slide(body, 0, 10, [platform], ONE_WAY) == []
+    assert body.y == 60
+
+
+def test_solid_block_stops_from_below():
+    block = pygame.Rect(0, 100, 200, 20)
+    body = pygame.Rect(50, 130, 40, 60)
+    move_and_slide(body, 0, -80, [block], ALL_FACES)
+    assert body.top == block.bottom
+
+
+def test_fast_fall_does_not_tunnel_through_thin_platform():
+    platform = pygame.Rect(0, 300, 400, 10)
+    body = pygame.Rect(100, 0, 40, 60)
+    # За тик тело пролетает в 50 раз дальше толщины платформы
+    contacts = move_and_slide(body, 0, 500, [platform])
+    assert body.bottom == platform.top
+    assert contacts == [(TOP, platform)]
+
+
+def test_fast_fall_stops_on_first_platform_in_path():
+    upper = pygame.Rect(0, 200, 400, 10)
+    lower = pygame.Rect(0, 400, 400, 10)
+    body = pygame.Rect(100, 0, 40, 60)
+    move_and_slide(body, 0, 900, [lower, upper])
+    assert body.bottom == upper.top
+
+
+def test_slide_keeps_remaining_horizontal_motion():
+    floor = pygame.Rect(0, 100, 400, 20)
+    body = pygame.Rect(0, 30, 40, 60)
+    move_and_slide(body, 40, 40, [floor])
+    assert body.bottom == floor.top
+    assert body.x == 40
+
+
+def test_sweep_hits_catches_fast_projectiles_and_skips_misses():
+    target = pygame.Rect(200, 100, 40, 60)
+    left = np.array([0.0, 0.0, 0.0, 210.0])
+    top = np.array([120.0, 0.0, 120.0, 130.0])
+    vx = np.array([400.0, 400.0, 100.0, 0.0])
+    vy = np.array([0.0, 0.0, 0.0, 0.0])
+    hits = sweep_hits(left, top, 10, 10, vx, vy, target)
+    # Сквозной пролёт за тик, мимо сверху, недолёт, перекрытие в начале пути
+    assert hits.tolist() == [True, False, False, True]
+
+
+def test_sweep_hits_touching_edge_is_not_a_hit():
+    target = pygame.Rect(200, 100, 40, 60)
+    # Снаряд доходит ровно до грани, но не входит
+    hits = sweep_hits([0.0], [120.0], 10, 10, [190.0], [0.0], target)
+    assert not hits[0]
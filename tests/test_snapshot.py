@@ -0,0 +1,88 @@
+import random
+
+import pygame
+import pytest
+
+from game import Game, GameState, ScriptedInput
+
+
+def fight_script(frames, offset=0):
+    # Удары, прыжки и ходьба туда-обратно, как в обычном бою
+    script = {}
+    for i in range(offset % 7, frames, 7):
+        script.setdefault(i, []).append(("tap", pygame.K_x))
+    for i in range(3, frames, 40):
+        script.setdefault(i, []).append(("tap", pygame.K_SPACE))
+    for i in range(0, frames, 150):
+        script.setdefault(i, []).append(("down", pygame.K_RIGHT))
+    for i in range(75, frames, 150):
+        script.setdefault(i, []).extend([("up", pygame.K_RIGHT), ("down", pygame.K_LEFT)])
+    for i in range(149, frames, 150):
+        script.setdefault(i, []).append(("up", pygame.K_LEFT))
+    return script
+
+
+def start_fight(seed=7, frames=240, coop=False):
+    random.seed(seed)
+    game = Game(headless=True, input_source=ScriptedInput(fight_script(frames)))
+    game.state = GameState.PLAYING
+    game.player.max_health = game.player.health = 1000
+    if coop:
+        game.add_player(200, 300)
+    game.spawn_enemies(5)
+    game.step(frames, render=False)
+    assert game.state == GameState.PLAYING
+    return game
+
+
+def replay(game, data, frames=300):
+    game.restore(data)
+    game.input = ScriptedInput(fight_script(frames, offset=3))
+    game.step(frames, render=False)
+    return game.snapshot()
+
+
+@pytest.mark.parametrize("coop", [False, True])
+def test_replay_after_restore_is_identical(coop):
+    game = start_fight(coop=coop)
+    data = game.snapshot()
+    assert len(game.projectiles) or len(game.enemy_wave)
+
+    first = replay(game, data)
+    second = replay(game, data)
+    assert first == second
+    assert first != data
+
+
+@pytest.mark.parametrize("coop", [False, True])
+def test_restore_into_fresh_game(coop):
+    game = start_fight(coop=coop)
+    data = game.snapshot()
+    expected = replay(game, data)
+
+    other = Game(headless=True)
+    other.state = GameState.PLAYING
+    assert replay(other, data) == expected
+    assert len(other.players) == len(game.players)
+
+
+def test_coop_players_survive_restore():
+    game = start_fight(coop=True)
+    partner = game.players[1]
+    partner.rect.topleft = (123, 456)
+    partner.health = 2
+    data = game.snapshot()
+
+    partner.rect.topleft = (0, 0)
+    partner.health = 5
+    game.restore(data)
+    assert game.players[1].rect.topleft == (123, 456)
+    assert game.players[1].health == 2
+
+    # Выбывший участник остаётся вне мира и после восстановления
+    partner.kill()
+    data = game.snapshot()
+    other = Game(headless=True)
+    other.restore(data)
+    assert len(other.players) == 2
+    assert not other.players[1].alive()
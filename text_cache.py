@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+
+class TextCache:
+    # LRU-кэш отрисованного текста по ключу (строка, цвет, сглаживание, шрифт)
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def render(self, font, text, antialias, color):
+        key = (text, tuple(color), antialias, font)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+
+
+class HudText:
+    # Надпись HUD, привязанная к значению: перерисовывается только когда
+    # value_getter() возвращает что-то новое
+    def __init__(self, cache, font, value_getter, template, color, antialias=True):
+        self.cache = cache
+        self.font = font
+        self.value_getter = value_getter
+        self.template = template
+        self.color = color
+        self.antialias = antialias
+        self.value = None
+        self.surface = None
+
+    def get_surface(self):
+        value = self.value_getter()
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.cache.render(self.font, self.template.format(*value),
+                                             self.antialias, self.color)
+        return self.surface
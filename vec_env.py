@@ -0,0 +1,293 @@
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from multiprocessing import shared_memory
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from game import Game, GameState, ScriptedInput
+
+# Действие - индекс в ACTIONS: (движение -1/0/1, прыжок, удар)
+ACTIONS = [(move, jump, attack) for move in (-1, 0, 1) for jump in (False, True) for attack in (False, True)]
+NEAREST_PROJECTILES = 4
+OBS_SIZE = 14 + NEAREST_PROJECTILES * 4
+
+# Параметры, которые можно менять в конфиге окружения
+CONFIG_KEYS = ("boss_attack_cooldown_max", "projectile_speed", "player_jump_power")
+
+
+class BossFightEnv:
+    # Окружение в стиле gym вокруг headless Game: reset() -> obs,
+    # step(action) -> (obs, reward, done, info)
+    def __init__(self, config=None, frame_skip=4, max_steps=3000, seed=None):
+        self.config = dict(config or {})
+        unknown = set(self.config) - set(CONFIG_KEYS)
+        if unknown:
+            raise ValueError(f"unknown config keys: {sorted(unknown)}")
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.seed = seed
+        self.input = ScriptedInput()
+        self.game = Game(headless=True, input_source=self.input)
+        self.obs = np.zeros(OBS_SIZE, dtype=np.float32)
+        self.steps = 0
+        self.episode_return = 0.0
+
+    def apply_config(self):
+        game = self.game
+        if "boss_attack_cooldown_max" in self.config:
+            game.boss.attack_cooldown_max = int(self.config["boss_attack_cooldown_max"])
+        if "projectile_speed" in self.config:
+            game.projectiles.speed = float(self.config["projectile_speed"])
+        if "player_jump_power" in self.config:
+            game.player.jump_power = float(self.config["player_jump_power"])
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.seed
+        if seed is not None:
+            random.seed(seed)
+            self.seed = seed + 1
+        self.input.held.clear()
+        self.input.pending.clear()
+        self.game.init_game()
+        self.game.state = GameState.PLAYING
+        self.apply_config()
+        self.steps = 0
+        self.episode_return = 0.0
+        return self.observe()
+
+    def apply_action(self, action):
+        move, jump, attack = ACTIONS[action]
+        for direction, key in ((-1, pygame.K_LEFT), (1, pygame.K_RIGHT)):
+            if move == direction and key not in self.input.held:
+                self.input.press(key)
+            elif move != direction and key in self.input.held:
+                self.input.release(key)
+        if jump:
+            self.input.tap(pygame.K_SPACE)
+        if attack:
+            self.input.tap(pygame.K_x)
+
+    def step(self, action):
+        game = self.game
+        boss_health = game.boss.health
+        player_health = game.player.health
+
+        self.apply_action(action)
+        for _ in range(self.frame_skip):
+            game.step(1, render=False)
+            if self.finished():
+                break
+        self.steps += 1
+
+        reward = float(boss_health - game.boss.health) - float(player_health - game.player.health)
+        won = not game.boss.is_alive()
+        lost = not game.player.is_alive()
+        if won:
+            reward += 10.0
+        elif lost:
+            reward -= 10.0
+        self.episode_return += reward
+        done = won or lost or self.steps >= self.max_steps
+        info = {"won": won, "steps": self.steps, "episode_return": self.episode_return} if done else {}
+        return self.observe(), reward, done, info
+
+    def finished(self):
+        game = self.game
+        return game.state != GameState.PLAYING or not game.boss.is_alive() or not game.player.is_alive()
+
+    def observe(self, out=None):
+        game = self.game
+        player = game.player
+        boss = game.boss
+        width, height = player.bounds.size
+        obs = self.obs if out is None else out
+        obs[:14] = (
+            player.rect.centerx / width, player.rect.centery / height,
+            player.velocity_x / 10.0, player.velocity_y / 20.0,
+            player.health / player.max_health, float(player.invulnerable > 0),
+            player.attack_cooldown / player.attack_cooldown_max, float(player.facing_right),
+            float(player.jumping),
+            (boss.rect.centerx - player.rect.centerx) / width,
+            (boss.rect.centery - player.rect.centery) / height,
+            boss.health / boss.max_health,
+            boss.attack_cooldown / max(1, boss.attack_cooldown_max),
+            float(boss.is_alive()),
+        )
+        obs[14:] = 0.0
+        pool = game.projectiles
+        n = len(pool)
+        if n:
+            rel = pool.pos[:n] - player.rect.center
+            order = np.argsort((rel ** 2).sum(axis=1))[:NEAREST_PROJECTILES]
+            block = np.column_stack((rel[order, 0] / width, rel[order, 1] / height,
+                                     pool.vel[order, 0] / 10.0, pool.vel[order, 1] / 10.0))
+            obs[14:14 + block.size] = block.ravel()
+        return obs
+
+
+def worker(conn, shm_name, n_envs, env_indices, configs, frame_skip, max_steps, seed):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    obs, rewards, dones = shared_views(shm.buf, n_envs)
+    envs = {i: BossFightEnv(configs[i], frame_skip, max_steps, seed + i) for i in env_indices}
+    try:
+        while True:
+            command, payload = conn.recv()
+            if command == "reset":
+                for i, env in envs.items():
+                    env.reset()
+                    env.observe(obs[i])
+                conn.send(None)
+            elif command == "step":
+                finished = []
+                for i, action in zip(env_indices, payload):
+                    env = envs[i]
+                    _, rewards[i], dones[i], info = env.step(action)
+                    if dones[i]:
+                        info["env"] = i
+                        info["config"] = env.config
+                        finished.append(info)
+                        env.reset()
+                    env.observe(obs[i])
+                conn.send(finished)
+            elif command == "close":
+                break
+    finally:
+        del obs, rewards, dones
+        shm.close()
+        conn.close()
+
+
+def shared_views(buf, n_envs):
+    obs_bytes = n_envs * OBS_SIZE * 4
+    obs = np.ndarray((n_envs, OBS_SIZE), dtype=np.float32, buffer=buf)
+    rewards = np.ndarray((n_envs,), dtype=np.float32, buffer=buf, offset=obs_bytes)
+    dones = np.ndarray((n_envs,), dtype=np.bool_, buffer=buf, offset=obs_bytes + n_envs * 4)
+    return obs, rewards, dones
+
+
+class VecEnv:
+    # N независимых headless-игр в пуле процессов. Наблюдения, награды и
+    # флаги завершения пишутся воркерами прямо в общую память; массивы,
+    # возвращаемые step(), перезаписываются на следующем шаге.
+    def __init__(self, n_envs, configs=None, processes=None, frame_skip=4, max_steps=3000, seed=0):
+        self.n_envs = n_envs
+        configs = list(configs) if configs else [{}] * n_envs
+        if len(configs) != n_envs:
+            raise ValueError("need one config per environment")
+        self.configs = configs
+        processes = min(processes or os.cpu_count() or 1, n_envs)
+        size = n_envs * (OBS_SIZE * 4 + 4 + 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.obs, self.rewards, self.dones = shared_views(self.shm.buf, n_envs)
+
+        ctx = mp.get_context("spawn")
+        self.slices = [list(range(n_envs))[p::processes] for p in range(processes)]
+        self.conns = []
+        self.procs = []
+        for env_indices in self.slices:
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=worker, args=(child, self.shm.name, n_envs, env_indices,
+                                                    configs, frame_skip, max_steps, seed), daemon=True)
+            proc.start()
+            child.close()
+            self.conns.append(parent)
+            self.procs.append(proc)
+
+    def reset(self):
+        for conn in self.conns:
+            conn.send(("reset", None))
+        for conn in self.conns:
+            conn.recv()
+        return self.obs
+
+    def step(self, actions):
+        for conn, env_indices in zip(self.conns, self.slices):
+            conn.send(("step", [int(actions[i]) for i in env_indices]))
+        infos = []
+        for conn in self.conns:
+            infos.extend(conn.recv())
+        return self.obs, self.rewards, self.dones, infos
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self.procs:
+            proc.join(timeout=5)
+        del self.obs, self.rewards, self.dones
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def random_policy(obs, rng):
+    return rng.integers(0, len(ACTIONS), size=len(obs))
+
+
+def sweep(grid, episodes_per_config=4, policy=random_policy, processes=None, seed=0):
+    # grid: {ключ конфига: [значения]}; возвращает статистику по каждому сочетанию
+    keys = sorted(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    configs = [combo for combo in combos for _ in range(episodes_per_config)]
+    results = {tuple(sorted(c.items())): [] for c in combos}
+    rng = np.random.default_rng(seed)
+    with VecEnv(len(configs), configs, processes, seed=seed) as env:
+        obs = env.reset()
+        pending = {i: True for i in range(len(configs))}
+        while pending:
+            obs, _, _, infos = env.step(policy(obs, rng))
+            for info in infos:
+                if pending.pop(info["env"], None):
+                    results[tuple(sorted(info["config"].items()))].append(info)
+    summary = []
+    for combo, infos in results.items():
+        summary.append({
+            "config": dict(combo),
+            "episodes": len(infos),
+            "win_rate": sum(info["won"] for info in infos) / max(1, len(infos)),
+            "mean_return": sum(info["episode_return"] for info in infos) / max(1, len(infos)),
+            "mean_steps": sum(info["steps"] for info in infos) / max(1, len(infos)),
+        })
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Скорость VecEnv на случайной политике")
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--steps", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    with VecEnv(args.envs, processes=args.processes) as env:
+        obs = env.reset()
+        start = time.perf_counter()
+        episodes = 0
+        for _ in range(args.steps):
+            obs, _, _, infos = env.step(random_policy(obs, rng))
+            episodes += len(infos)
+        elapsed = time.perf_counter() - start
+    total = args.envs * args.steps
+    print(f"{total} env steps in {elapsed:.2f} s: {total / elapsed:.0f} steps/s, {episodes} episodes finished")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())